@@ -8,13 +8,19 @@ Gen_PhotoNVideo 后端配置管理模块
 """
 
 import os
+import queue
 import logging
+import logging.handlers
 from pathlib import Path
 from dotenv import load_dotenv
-from typing import List
+from typing import List, Optional, Set
 
 # 加载 .env 文件中的环境变量
-load_dotenv()
+# - 生产环境 (ENV=production) 直接使用真实环境变量，跳过 .env 文件解析
+# - 同一进程及其子进程 (如 dev reload) 只解析一次
+if os.getenv("ENV") != "production" and not os.environ.get("_DOTENV_LOADED"):
+    load_dotenv(override=False)
+    os.environ["_DOTENV_LOADED"] = "1"
 
 
 class Config:
@@ -40,7 +46,9 @@ class Config:
 
     # 数据目录
     DATA_DIR: Path = BASE_DIR / "data"
-    HISTORY_FILE: Path = DATA_DIR / "history.json"
+    HISTORY_FILE: Path = DATA_DIR / "history.jsonl"
+    # 旧版整文件 JSON 格式，首次启动时自动迁移到 HISTORY_FILE
+    LEGACY_HISTORY_FILE: Path = DATA_DIR / "history.json"
 
     # 日志目录
     LOGS_DIR: Path = BASE_DIR / "logs"
@@ -72,23 +80,61 @@ class Config:
     JOB_TTL_HOURS: int = int(os.getenv("JOB_TTL_HOURS", "24"))
     SESSION_TTL_HOURS: int = int(os.getenv("SESSION_TTL_HOURS", "24"))
     PROCESSING_JOB_MAX_SECONDS: int = int(os.getenv("PROCESSING_JOB_MAX_SECONDS", "1800"))
+    # 内存中保留的任务与会话数量上限，超出时优先淘汰最旧的已结束任务与最久未用的会话
+    MAX_JOBS: int = int(os.getenv("MAX_JOBS", "500"))
+    MAX_SESSIONS: int = int(os.getenv("MAX_SESSIONS", "200"))
+    # 过期任务与会话的清理间隔 (秒)
+    JOB_CLEANUP_INTERVAL_SECONDS: int = int(os.getenv("JOB_CLEANUP_INTERVAL_SECONDS", "60"))
+    # 普通模式多图生成时同时进行的 API 请求数上限
+    IMAGE_PARALLEL_LIMIT: int = int(os.getenv("IMAGE_PARALLEL_LIMIT", "3"))
+    # 同时执行的图像生成任务上限，超出的任务保持排队状态
+    MAX_CONCURRENT_IMAGE_JOBS: int = int(os.getenv("MAX_CONCURRENT_IMAGE_JOBS", "4"))
+    # 排队等待的图像生成任务上限，超出后新请求返回 503
+    MAX_QUEUED_IMAGE_JOBS: int = int(os.getenv("MAX_QUEUED_IMAGE_JOBS", "20"))
+    # 文件读写专用线程池大小 (保存生成结果、读写历史记录)
+    FILE_IO_WORKERS: int = int(os.getenv("FILE_IO_WORKERS", "8"))
+    # 图像服务专用线程池大小 (承载阻塞的 API 调用与图像编解码)
+    GENAI_IMAGE_WORKERS: int = int(os.getenv("GENAI_IMAGE_WORKERS", "16"))
     # 图像生成可能耗时较长，默认放宽到 5 分钟
     GENAI_IMAGE_TIMEOUT_SECONDS: int = int(os.getenv("GENAI_IMAGE_TIMEOUT_SECONDS", "300"))
     GENAI_PROMPT_TIMEOUT_SECONDS: int = int(os.getenv("GENAI_PROMPT_TIMEOUT_SECONDS", "60"))
     GENAI_VIDEO_API_TIMEOUT_SECONDS: int = int(os.getenv("GENAI_VIDEO_API_TIMEOUT_SECONDS", "120"))
     GENAI_VIDEO_POLL_TIMEOUT_SECONDS: int = int(os.getenv("GENAI_VIDEO_POLL_TIMEOUT_SECONDS", "1800"))
+    # 视频服务专用线程池大小 (承载阻塞的 API 调用、帧解码、下载与写盘)
+    GENAI_VIDEO_WORKERS: int = int(os.getenv("GENAI_VIDEO_WORKERS", "8"))
+    # 同时进行的视频下载数上限 (每个下载在内存中持有完整视频)
+    VIDEO_DOWNLOAD_CONCURRENCY: int = int(os.getenv("VIDEO_DOWNLOAD_CONCURRENCY", "2"))
+    # 相同请求的视频生成结果缓存条数上限 (默认 0 关闭；开启后相同请求直接返回已生成的视频或等待进行中的同一生成，不再重新生成)
+    VIDEO_CACHE_MAX: int = int(os.getenv("VIDEO_CACHE_MAX", "0"))
+
+    # 本进程内已确认存在的目录，避免重复 mkdir 系统调用
+    _ensured: Set[Path] = set()
+
+    # 日志后台监听器 (由 setup_logging 创建，应用启动时确保运行，关闭时停止)
+    LOG_LISTENER: Optional[logging.handlers.QueueListener] = None
+    # 日志后台监听器是否正在运行 (同一进程内可多次启动/停止，如重复进入应用生命周期)
+    LOG_LISTENER_RUNNING: bool = False
+    # 文件日志的内存缓冲处理器 (应用关闭时需刷新)
+    LOG_MEMORY_HANDLER: Optional[logging.handlers.MemoryHandler] = None
 
     @classmethod
     def ensure_directories(cls) -> None:
         """
         确保所有必要的目录存在
 
-        如果目录不存在则创建它们
+        如果目录不存在则创建它们；同一进程内已创建过的目录直接跳过
         """
-        cls.IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-        cls.VIDEOS_DIR.mkdir(parents=True, exist_ok=True)
-        cls.DATA_DIR.mkdir(parents=True, exist_ok=True)
-        cls.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        for path in (cls.IMAGES_DIR, cls.VIDEOS_DIR, cls.DATA_DIR, cls.LOGS_DIR):
+            if path in cls._ensured:
+                continue
+            # 常见情况是目录已存在：直接 mkdir 一次，失败再按需补建父目录
+            try:
+                os.mkdir(path)
+            except FileExistsError:
+                pass
+            except FileNotFoundError:
+                os.makedirs(path, exist_ok=True)
+            cls._ensured.add(path)
 
     @classmethod
     def validate(cls) -> bool:
@@ -108,13 +154,15 @@ def setup_logging() -> logging.Logger:
     """
     设置日志系统
 
-    配置日志格式、级别和输出位置
+    配置日志格式、级别和输出位置。
+    记录器只挂载 QueueHandler，真正的文件/控制台写入由后台 QueueListener
+    线程完成，避免在异步请求处理中同步阻塞磁盘 IO。
 
     Returns:
         logging.Logger: 配置好的日志记录器
     """
     # 确保日志目录存在
-    Config.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+    Config.ensure_directories()
 
     # 创建日志记录器
     logger = logging.getLogger("gen_photo_n_video")
@@ -132,25 +180,70 @@ def setup_logging() -> logging.Logger:
         datefmt="%Y-%m-%d %H:%M:%S"
     )
 
-    # 文件处理器 - 记录所有级别的日志
-    file_handler = logging.FileHandler(
+    # 文件处理器 - 记录所有级别的日志，按大小轮转
+    file_handler = logging.handlers.RotatingFileHandler(
         Config.LOG_FILE,
+        maxBytes=10 * 1024 * 1024,
+        backupCount=5,
         encoding="utf-8"
     )
     file_handler.setLevel(logging.DEBUG)
     file_handler.setFormatter(formatter)
 
+    # 文件写入前先在内存中攒批，满 256 条或遇到 ERROR 时再统一落盘
+    memory_handler = logging.handlers.MemoryHandler(
+        capacity=256,
+        flushLevel=logging.ERROR,
+        target=file_handler
+    )
+
     # 控制台处理器 - 只记录 INFO 及以上级别
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
     console_handler.setFormatter(formatter)
 
-    # 添加处理器
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    # 请求协程只做一次内存入队，由后台线程分发到各处理器
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    listener = logging.handlers.QueueListener(
+        log_queue,
+        memory_handler,
+        console_handler,
+        respect_handler_level=True
+    )
+    Config.LOG_LISTENER = listener
+    Config.LOG_MEMORY_HANDLER = memory_handler
+    start_log_listener()
 
     return logger
 
 
+def start_log_listener() -> None:
+    """
+    启动日志后台线程 (已在运行时直接返回)
+
+    应用启动时调用，使同一进程内再次进入生命周期时日志队列仍有线程消费。
+    """
+    if Config.LOG_LISTENER is None or Config.LOG_LISTENER_RUNNING:
+        return
+    Config.LOG_LISTENER.start()
+    Config.LOG_LISTENER_RUNNING = True
+
+
+def stop_log_listener() -> None:
+    """
+    停止日志后台线程，并将队列与内存缓冲中剩余的日志写入磁盘
+
+    应用关闭时调用；之后可通过 start_log_listener 重新启动。
+    """
+    if Config.LOG_LISTENER is not None and Config.LOG_LISTENER_RUNNING:
+        Config.LOG_LISTENER.stop()
+        Config.LOG_LISTENER_RUNNING = False
+
+    if Config.LOG_MEMORY_HANDLER is not None:
+        Config.LOG_MEMORY_HANDLER.flush()
+
+
 # 初始化日志记录器
 logger = setup_logging()
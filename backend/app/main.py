@@ -11,10 +11,12 @@ FastAPI 应用程序入口点，负责:
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 
-from .config import Config, logger
+from .config import Config, logger, start_log_listener, stop_log_listener
 from .routers import image_router, video_router, history_router
+from .services import history_service, image_service, video_service
 
 
 @asynccontextmanager
@@ -26,9 +28,8 @@ async def lifespan(app: FastAPI):
     在应用关闭时执行清理操作
     """
     # 启动时执行
-    logger.info("=" * 50)
-    logger.info("Gen_PhotoNVideo 后端服务启动")
-    logger.info("=" * 50)
+    # 确保日志后台线程在运行 (同一进程内上次关闭时已停止)
+    start_log_listener()
 
     # 确保必要的目录存在
     Config.ensure_directories()
@@ -37,15 +38,38 @@ async def lifespan(app: FastAPI):
     if not Config.validate():
         logger.warning("配置验证失败，部分功能可能不可用")
 
-    logger.info(f"图像输出目录: {Config.IMAGES_DIR}")
-    logger.info(f"视频输出目录: {Config.VIDEOS_DIR}")
-    logger.info(f"历史记录文件: {Config.HISTORY_FILE}")
+    # 预热历史记录缓存，避免首个请求承担解析开销
+    count = await history_service.warm_cache()
+
+    # 启动图像服务的定时清理任务
+    image_service.start()
+
+    # 启动信息合并为一条日志，避免与其他日志交错
+    separator = "=" * 50
+    logger.info(
+        "\n%s\nGen_PhotoNVideo 后端服务启动\n%s"
+        "\n图像输出目录: %s\n视频输出目录: %s\n历史记录文件: %s\n历史记录已加载: %d 条",
+        separator,
+        separator,
+        Config.IMAGES_DIR,
+        Config.VIDEOS_DIR,
+        Config.HISTORY_FILE,
+        count
+    )
 
     yield
 
     # 关闭时执行
     logger.info("Gen_PhotoNVideo 后端服务关闭")
 
+    # 停止图像服务的定时清理并释放专用线程池
+    image_service.close()
+    # 关闭视频服务专用线程池
+    video_service.close()
+
+    # 停止日志后台线程，确保队列与内存缓冲中剩余日志写入磁盘 (下次启动时重新启动)
+    stop_log_listener()
+
 
 # 创建 FastAPI 应用实例
 app = FastAPI(
@@ -53,6 +77,8 @@ app = FastAPI(
     description="基于 Google Gemini API 的图像和视频生成服务",
     version="1.0.0",
     lifespan=lifespan,
+    # 使用 orjson 序列化 JSON 响应
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc"
 )
@@ -105,11 +131,15 @@ async def health_check():
 
 # 用于直接运行的入口
 if __name__ == "__main__":
+    import sys
     import uvicorn
 
     uvicorn.run(
         "app.main:app",
         host=Config.HOST,
         port=Config.PORT,
-        reload=True
+        reload=True,
+        # uvicorn[standard] 已附带 uvloop (Windows 除外) 与 httptools
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     )
@@ -14,6 +14,7 @@ from .schemas import (
     VideoResponse,
     HistoryItem,
     HistoryResponse,
+    HistoryBatchDeleteRequest,
     ImageLibraryItem,
     ImageLibraryDayGroup,
     ImageLibraryResponse,
@@ -36,6 +37,7 @@ __all__ = [
     "VideoResponse",
     "HistoryItem",
     "HistoryResponse",
+    "HistoryBatchDeleteRequest",
     "ImageLibraryItem",
     "ImageLibraryDayGroup",
     "ImageLibraryResponse",
@@ -6,7 +6,8 @@ Gen_PhotoNVideo 数据模型定义
 """
 
 from typing import Optional, List, Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+from pydantic.dataclasses import dataclass
 from datetime import datetime
 
 
@@ -37,6 +38,8 @@ class ImageGenerateRequest(BaseModel):
         reference_images: 参考图像的 base64 编码列表 (可选，最多 14 张)
         reference_image: 兼容旧版的单张参考图 base64 编码 (可选)
     """
+    model_config = ConfigDict(extra="forbid")
+
     prompt: str = Field(..., min_length=1, description="图像描述")
     generation_mode: Literal["standard", "pro"] = Field(
         default="standard",
@@ -48,7 +51,6 @@ class ImageGenerateRequest(BaseModel):
     )
     aspect_ratio: str = Field(
         default="3:2",
-        pattern=r"^\d+:\d+$",
         description="宽高比"
     )
     resolution: Literal["0.5K", "1K", "2K", "4K"] = Field(
@@ -91,6 +93,26 @@ class ImageGenerateRequest(BaseModel):
     )
     reference_image: Optional[str] = Field(default=None, description="参考图 base64")
 
+    @field_validator("aspect_ratio")
+    @classmethod
+    def _validate_ratio(cls, v: str) -> str:
+        """
+        校验宽高比格式为 N:M（用 partition + isdigit 代替正则匹配）
+
+        Args:
+            v: 宽高比字符串
+
+        Returns:
+            str: 原样返回的宽高比
+
+        Raises:
+            ValueError: 格式不是 N:M 时
+        """
+        a, sep, b = v.partition(":")
+        if sep and a.isdigit() and b.isdigit():
+            return v
+        raise ValueError("aspect_ratio 格式必须为 N:M")
+
 
 class ImageEditRequest(BaseModel):
     """
@@ -102,6 +124,8 @@ class ImageEditRequest(BaseModel):
         aspect_ratio: 图像宽高比
         resolution: 图像分辨率
     """
+    model_config = ConfigDict(extra="forbid")
+
     session_id: str = Field(..., description="会话 ID")
     prompt: str = Field(..., min_length=1, max_length=2000, description="编辑指令")
     aspect_ratio: str = Field(default="3:2", description="宽高比")
@@ -116,6 +140,8 @@ class EnhancePromptRequest(BaseModel):
         prompt: 原始提示词
         target_type: 目标类型 (image 或 video)
     """
+    model_config = ConfigDict(extra="forbid")
+
     prompt: str = Field(..., min_length=1, max_length=500, description="原始提示词")
     target_type: Literal["image", "video"] = Field(
         default="image",
@@ -134,6 +160,8 @@ class ImageResponse(BaseModel):
         session_id: 会话 ID (用于多轮对话)
         message: 附加消息
     """
+    model_config = ConfigDict(frozen=True)
+
     success: bool
     job_id: Optional[str] = None
     images: List[str] = Field(default_factory=list)
@@ -156,7 +184,10 @@ class ImageStatusResponse(BaseModel):
         aspect_ratio: 生成图像使用的宽高比
         resolution: 生成图像使用的分辨率
         image_model: 生成图像使用的模型标识
+        revision: 状态版本号 (长轮询时回传)
     """
+    model_config = ConfigDict(frozen=True)
+
     job_id: str
     status: str
     progress: int
@@ -167,6 +198,7 @@ class ImageStatusResponse(BaseModel):
     aspect_ratio: str = "3:2"
     resolution: str = "未知"
     image_model: str = "nano_banana_pro"
+    revision: int = 0
 
 
 # ==================== 视频相关模型 ====================
@@ -184,6 +216,8 @@ class VideoGenerateRequest(BaseModel):
         first_frame: 首帧图像 base64 (可选)
         last_frame: 尾帧图像 base64 (可选)
     """
+    model_config = ConfigDict(extra="forbid")
+
     prompt: str = Field(..., min_length=1, max_length=2000, description="视频描述")
     mode: Literal["text2vid", "img2vid", "first_last"] = Field(
         default="text2vid",
@@ -214,6 +248,8 @@ class VideoExtendRequest(BaseModel):
         prompt: 延长部分的描述
         aspect_ratio: 视频宽高比 (16:9 或 9:16)
     """
+    model_config = ConfigDict(extra="forbid")
+
     video_id: str = Field(..., description="视频 ID")
     prompt: str = Field(..., min_length=1, max_length=2000, description="延长描述")
     aspect_ratio: Literal["16:9", "9:16"] = Field(default="16:9", description="视频宽高比")
@@ -246,6 +282,8 @@ class VideoResponse(BaseModel):
         job_id: 任务 ID
         message: 消息
     """
+    model_config = ConfigDict(frozen=True)
+
     success: bool
     job_id: str
     message: Optional[str] = None
@@ -253,23 +291,26 @@ class VideoResponse(BaseModel):
 
 # ==================== 历史记录模型 ====================
 
-class HistoryItem(BaseModel):
+@dataclass(frozen=True, slots=True)
+class HistoryItem:
     """
     历史记录项模型
 
+    列表响应中会批量创建，使用 slots 数据类以减少单个实例的内存占用
+
     Attributes:
         id: 记录 ID
         type: 类型 (image 或 video)
         prompt: 使用的提示词
         filename: 生成的文件名
-        created_at: 创建时间
+        created_at: 创建时间 (ISO 8601 字符串，写入记录时已格式化，原样透传)
         params: 生成参数
     """
     id: str
     type: Literal["image", "video"]
     prompt: str
     filename: str
-    created_at: datetime
+    created_at: str = Field(json_schema_extra={"format": "date-time"})
     params: dict = Field(default_factory=dict)
 
 
@@ -281,10 +322,24 @@ class HistoryResponse(BaseModel):
         items: 历史记录列表
         total: 总数
     """
+    model_config = ConfigDict(frozen=True)
+
     items: List[HistoryItem]
     total: int
 
 
+class HistoryBatchDeleteRequest(BaseModel):
+    """
+    批量删除历史记录请求模型
+
+    Attributes:
+        ids: 要删除的记录 ID 列表
+    """
+    model_config = ConfigDict(extra="forbid")
+
+    ids: List[str] = Field(..., min_length=1, max_length=1000, description="要删除的记录 ID 列表")
+
+
 class ImageLibraryItem(BaseModel):
     """
     图库项模型
@@ -400,6 +455,8 @@ class ErrorResponse(BaseModel):
         error: 错误消息
         detail: 详细信息 (可选)
     """
+    model_config = ConfigDict(frozen=True)
+
     success: bool = False
     error: str
     detail: Optional[str] = None
@@ -413,5 +470,7 @@ class PromptResponse(BaseModel):
         success: 是否成功
         enhanced_prompt: 优化后的提示词
     """
+    model_config = ConfigDict(frozen=True)
+
     success: bool
     enhanced_prompt: str
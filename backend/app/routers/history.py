@@ -7,7 +7,7 @@
 from typing import Optional
 from fastapi import APIRouter, HTTPException, Query
 
-from ..models import HistoryResponse, ErrorResponse
+from ..models import HistoryResponse, HistoryBatchDeleteRequest, ErrorResponse
 from ..services import history_service
 from ..utils import raise_internal_error
 
@@ -79,6 +79,35 @@ async def delete_history(record_id: str) -> dict:
         raise_internal_error("删除历史记录失败", e)
 
 
+@router.post(
+    "/batch-delete",
+    summary="批量删除历史记录",
+    description="一次删除多条历史记录，不存在的 ID 会被忽略"
+)
+async def batch_delete_history(request: HistoryBatchDeleteRequest) -> dict:
+    """
+    批量删除历史记录 API
+
+    Args:
+        request: 批量删除请求，包含:
+            - ids: 要删除的记录 ID 列表
+
+    Returns:
+        dict: 操作结果，包含删除的记录数量
+    """
+    try:
+        deleted_count = await history_service.delete_records(request.ids)
+
+        return {
+            "success": True,
+            "message": f"已删除 {deleted_count} 条记录",
+            "deleted_count": deleted_count
+        }
+
+    except Exception as e:
+        raise_internal_error("批量删除历史记录失败", e)
+
+
 @router.delete(
     "",
     summary="清空历史记录",
@@ -4,11 +4,14 @@
 提供图像生成、编辑和提示词优化的 API 端点
 """
 
+import asyncio
+import logging
+import os
 from datetime import date
 from typing import Optional, Literal
 
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 
 from ..config import Config, logger
 from ..models import (
@@ -21,17 +24,20 @@ from ..models import (
     PromptResponse,
     ErrorResponse,
 )
-from ..services import image_service, prompt_service, history_service
+from ..services import image_service, prompt_service, history_service, ImageQueueFullError
 from ..utils import safe_resolve_path, raise_internal_error
 
 # 创建路由器
 router = APIRouter(prefix="/api/image", tags=["图像"])
 
+# 图像文件访问允许的扩展名
+_IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg"})
+
 
 @router.post(
     "/generate",
     response_model=ImageResponse,
-    responses={500: {"model": ErrorResponse}},
+    responses={500: {"model": ErrorResponse}, 503: {"model": ErrorResponse}},
     summary="生成图像",
     description="根据文本描述生成图像(异步),立即返回job_id"
 )
@@ -62,7 +68,9 @@ async def generate_image(request: ImageGenerateRequest) -> ImageResponse:
         ImageResponse: 包含job_id
     """
     try:
-        logger.info(f"收到图像生成请求: prompt={request.prompt[:50]}...")
+        # 仅在 INFO 启用时才截取 prompt，避免无谓的切片分配
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("收到图像生成请求: prompt=%s...", request.prompt[:50])
 
         # 调用图像服务启动后台任务
         job_id = await image_service.generate_images(
@@ -93,8 +101,11 @@ async def generate_image(request: ImageGenerateRequest) -> ImageResponse:
             message="图像生成任务已启动"
         )
 
+    except ImageQueueFullError as e:
+        logger.warning("图像生成任务排队已满: %s", e)
+        raise HTTPException(status_code=503, detail=str(e))
     except ValueError as e:
-        logger.warning(f"图像生成请求无效: {e}")
+        logger.warning("图像生成请求无效: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # 统一错误处理，避免泄露内部异常信息
@@ -108,17 +119,29 @@ async def generate_image(request: ImageGenerateRequest) -> ImageResponse:
     summary="查询图像生成状态",
     description="查询图像生成任务的状态和进度"
 )
-async def get_image_status(job_id: str) -> ImageStatusResponse:
+async def get_image_status(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="长轮询最长等待秒数，0 表示立即返回"),
+    revision: Optional[int] = Query(None, description="客户端已知的状态版本号，配合 wait 使用")
+) -> ImageStatusResponse:
     """
     查询图像生成任务状态 API
 
+    同时提供 wait 与 revision 时进行长轮询：任务状态版本号变化、
+    任务结束或等待超时后才返回，客户端无需高频轮询。
+
     Args:
         job_id: 任务ID
+        wait: 长轮询最长等待秒数
+        revision: 客户端已知的状态版本号
 
     Returns:
         ImageStatusResponse: 任务状态信息
     """
-    job = image_service.get_job_status(job_id)
+    if wait > 0 and revision is not None:
+        job = await image_service.wait_for_update(job_id, revision, wait)
+    else:
+        job = image_service.get_job_status(job_id)
 
     if not job:
         raise HTTPException(status_code=404, detail="任务不存在")
@@ -138,6 +161,7 @@ async def get_image_status(job_id: str) -> ImageStatusResponse:
         aspect_ratio=job.aspect_ratio,
         resolution=job.resolution,
         image_model=job.image_model,
+        revision=job.revision,
     )
 
 
@@ -163,7 +187,7 @@ async def edit_image(request: ImageEditRequest) -> ImageResponse:
         ImageResponse: 包含编辑后的图像文件名列表
     """
     try:
-        logger.info(f"收到图像编辑请求: session_id={request.session_id}")
+        logger.info("收到图像编辑请求: session_id=%s", request.session_id)
 
         # 调用图像服务编辑图像
         images = await image_service.edit_image(
@@ -195,7 +219,7 @@ async def edit_image(request: ImageEditRequest) -> ImageResponse:
         )
 
     except ValueError as e:
-        logger.warning(f"图像编辑请求无效: {e}")
+        logger.warning("图像编辑请求无效: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise_internal_error("图像编辑失败", e)
@@ -221,7 +245,8 @@ async def enhance_prompt(request: EnhancePromptRequest) -> PromptResponse:
         PromptResponse: 包含优化后的提示词
     """
     try:
-        logger.info(f"收到提示词优化请求: {request.prompt[:50]}...")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("收到提示词优化请求: %s...", request.prompt[:50])
 
         # 调用提示词服务
         enhanced = await prompt_service.enhance_prompt(
@@ -252,7 +277,7 @@ async def get_image_library(
         "standard",
         description='图库筛选模式："standard" 普通图，"pro" 专业图'
     )
-) -> ImageLibraryResponse:
+) -> ORJSONResponse:
     """
     获取按天分组的图片图库 API
 
@@ -262,7 +287,7 @@ async def get_image_library(
         limit_days: 分页每次最多返回多少天
 
     Returns:
-        ImageLibraryResponse: 图库分组数据
+        ORJSONResponse: 结构同 ImageLibraryResponse，图库分组数据
     """
     try:
         before_date: Optional[date] = None
@@ -279,7 +304,8 @@ async def get_image_library(
             generation_mode=generation_mode
         )
 
-        return ImageLibraryResponse(**library_data)
+        # 服务层已按响应结构组装好数据，直接序列化返回
+        return ORJSONResponse(content=library_data)
 
     except HTTPException:
         raise
@@ -307,12 +333,15 @@ async def get_image(filename: str) -> FileResponse:
         file_path = safe_resolve_path(
             base_dir=Config.IMAGES_DIR,
             filename=filename,
-            allowed_extensions={".png", ".jpg", ".jpeg"}
+            allowed_extensions=_IMAGE_EXTENSIONS
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    if not file_path.exists():
+    # 在线程中 stat 并将结果交给 FileResponse：不阻塞事件循环，也避免响应内部重复 stat
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except OSError:
         raise HTTPException(status_code=404, detail="图像不存在")
 
     suffix = file_path.suffix.lower()
@@ -323,7 +352,8 @@ async def get_image(filename: str) -> FileResponse:
     return FileResponse(
         path=file_path,
         media_type=media_type,
-        filename=filename
+        filename=filename,
+        stat_result=stat_result
     )
 
 
@@ -4,11 +4,13 @@
 提供视频生成、状态查询和视频延长的 API 端点
 """
 
+import asyncio
+import os
 from datetime import date
 from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 
 from ..config import Config, logger
 from ..models import (
@@ -25,6 +27,27 @@ from ..utils import safe_resolve_path, raise_internal_error
 # 创建路由器
 router = APIRouter(prefix="/api/video", tags=["视频"])
 
+# 状态查询的提示文案，轮询路径上直接复用
+_WAIT_MSG = "等待处理"
+_DONE_MSG = "视频生成完成"
+_FAILED_MSG = "视频生成失败"
+_PROGRESS_FMT = "正在生成中... {}%".format
+
+# 各生成模式必须提供的图像字段，以及缺失时的错误提示
+_REQUIRED_FRAMES = {
+    "img2vid": (("first_frame", "图生视频模式需要提供首帧图像"),),
+    "first_last": (
+        ("first_frame", "首尾帧模式需要提供首帧图像"),
+        ("last_frame", "首尾帧模式需要提供尾帧图像"),
+    ),
+}
+
+# 仅支持 8 秒时长的分辨率
+_EIGHT_SECOND_RESOLUTIONS = frozenset({"1080p", "4k"})
+
+# 视频文件访问允许的扩展名
+_VIDEO_EXTENSIONS = frozenset({".mp4"})
+
 
 @router.post(
     "/generate",
@@ -33,7 +56,7 @@ router = APIRouter(prefix="/api/video", tags=["视频"])
     summary="生成视频",
     description="根据文本描述生成视频，支持多种模式"
 )
-async def generate_video(request: VideoGenerateRequest) -> VideoResponse:
+async def generate_video(request: VideoGenerateRequest) -> ORJSONResponse:
     """
     生成视频 API
 
@@ -47,35 +70,22 @@ async def generate_video(request: VideoGenerateRequest) -> VideoResponse:
             - last_frame: 尾帧图像 base64 (可选)
 
     Returns:
-        VideoResponse: 包含任务 ID
+        ORJSONResponse: 结构同 VideoResponse，包含任务 ID
 
     Note:
         视频生成是异步操作，需要通过 /status/{job_id} 查询进度
     """
     try:
-        logger.info(f"收到视频生成请求: mode={request.mode}")
-
-        # 验证请求参数
-        if request.mode == "img2vid" and not request.first_frame:
-            raise HTTPException(
-                status_code=400,
-                detail="图生视频模式需要提供首帧图像"
-            )
-
-        if request.mode == "first_last" and not request.first_frame:
-            raise HTTPException(
-                status_code=400,
-                detail="首尾帧模式需要提供首帧图像"
-            )
-        if request.mode == "first_last" and not request.last_frame:
-            raise HTTPException(
-                status_code=400,
-                detail="首尾帧模式需要提供尾帧图像"
-            )
+        logger.info("收到视频生成请求: mode=%s", request.mode)
+
+        # 验证请求参数：按模式查表检查必需的图像字段
+        for field_name, detail in _REQUIRED_FRAMES.get(request.mode, ()):
+            if not getattr(request, field_name):
+                raise HTTPException(status_code=400, detail=detail)
 
         # 1080p 和 4k 仅支持 8 秒
-        if request.resolution in ["1080p", "4k"]:
-            logger.info(f"使用 {request.resolution} 分辨率，视频长度限制为 8 秒")
+        if request.resolution in _EIGHT_SECOND_RESOLUTIONS:
+            logger.info("使用 %s 分辨率，视频长度限制为 8 秒", request.resolution)
 
         # 启动视频生成任务
         job_id = await video_service.generate_video(
@@ -88,11 +98,12 @@ async def generate_video(request: VideoGenerateRequest) -> VideoResponse:
             last_frame=request.last_frame
         )
 
-        return VideoResponse(
-            success=True,
-            job_id=job_id,
-            message="视频生成任务已创建，请通过 /status/{job_id} 查询进度"
-        )
+        # 直接返回响应对象，跳过 response_model 的二次校验与编码
+        return ORJSONResponse(content={
+            "success": True,
+            "job_id": job_id,
+            "message": "视频生成任务已创建，请通过 /status/{job_id} 查询进度"
+        })
 
     except HTTPException:
         raise
@@ -125,7 +136,7 @@ async def extend_video(request: VideoExtendRequest) -> VideoResponse:
         - 视频最长可延长至 148 秒
     """
     try:
-        logger.info(f"收到视频延长请求: video_id={request.video_id}")
+        logger.info("收到视频延长请求: video_id=%s", request.video_id)
 
         job_id = await video_service.extend_video(
             video_id=request.video_id,
@@ -140,7 +151,7 @@ async def extend_video(request: VideoExtendRequest) -> VideoResponse:
         )
 
     except ValueError as e:
-        logger.warning(f"视频延长请求无效: {e}")
+        logger.warning("视频延长请求无效: %s", e)
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise_internal_error("视频延长请求失败", e)
@@ -152,7 +163,7 @@ async def extend_video(request: VideoExtendRequest) -> VideoResponse:
     summary="查询视频生成状态",
     description="查询视频生成任务的进度和状态"
 )
-async def get_video_status(job_id: str) -> VideoStatusResponse:
+async def get_video_status(job_id: str) -> ORJSONResponse:
     """
     查询视频生成状态 API
 
@@ -160,35 +171,38 @@ async def get_video_status(job_id: str) -> VideoStatusResponse:
         job_id: 任务 ID
 
     Returns:
-        VideoStatusResponse: 包含任务状态、进度和视频 URL
+        ORJSONResponse: 结构同 VideoStatusResponse，包含任务状态、进度和视频 URL
     """
     job = video_service.get_job_status(job_id)
 
     if job is None:
         raise HTTPException(status_code=404, detail="任务不存在")
 
-    # 构建响应
-    response = VideoStatusResponse(
-        job_id=job.job_id,
-        status=job.status.value,
-        progress=job.progress
-    )
+    # 前端会高频轮询该接口：直接构建字典返回，
+    # 跳过 response_model 的校验与 jsonable_encoder（response_model 仅用于文档）
+    video_url: Optional[str] = None
 
     # 如果完成，添加视频 URL
     if job.status == JobStatus.COMPLETED and job.video_filename:
-        response.video_url = f"/api/video/{job.video_filename}"
-        response.message = "视频生成完成"
+        video_url = f"/api/video/{job.video_filename}"
+        message = _DONE_MSG
 
     elif job.status == JobStatus.FAILED:
-        response.message = job.error_message or "视频生成失败"
+        message = job.error_message or _FAILED_MSG
 
     elif job.status == JobStatus.PROCESSING:
-        response.message = f"正在生成中... {job.progress}%"
+        message = _PROGRESS_FMT(job.progress)
 
     else:
-        response.message = "等待处理"
+        message = _WAIT_MSG
 
-    return response
+    return ORJSONResponse(content={
+        "job_id": job.job_id,
+        "status": job.status.value,
+        "progress": job.progress,
+        "video_url": video_url,
+        "message": message
+    })
 
 
 @router.get(
@@ -201,7 +215,7 @@ async def get_video_library(
     days: int = Query(7, ge=1, le=30, description="首次加载最近天数"),
     before: Optional[str] = Query(None, description="分页锚点（YYYY-MM-DD）"),
     limit_days: int = Query(7, ge=1, le=30, description="分页每次返回天数")
-) -> VideoLibraryResponse:
+) -> ORJSONResponse:
     """
     获取按天分组的视频图库 API
 
@@ -211,7 +225,7 @@ async def get_video_library(
         limit_days: 分页每次最多返回多少天
 
     Returns:
-        VideoLibraryResponse: 图库分组数据
+        ORJSONResponse: 结构同 VideoLibraryResponse，图库分组数据
     """
     try:
         before_date: Optional[date] = None
@@ -227,7 +241,8 @@ async def get_video_library(
             limit_days=limit_days
         )
 
-        return VideoLibraryResponse(**library_data)
+        # 服务层已按响应结构组装好数据，直接序列化返回
+        return ORJSONResponse(content=library_data)
 
     except HTTPException:
         raise
@@ -255,16 +270,20 @@ async def get_video(filename: str) -> FileResponse:
         file_path = safe_resolve_path(
             base_dir=Config.VIDEOS_DIR,
             filename=filename,
-            allowed_extensions={".mp4"}
+            allowed_extensions=_VIDEO_EXTENSIONS
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    if not file_path.exists():
+    # 在线程中 stat 并将结果交给 FileResponse：不阻塞事件循环，也避免响应内部重复 stat
+    try:
+        stat_result = await asyncio.to_thread(os.stat, file_path)
+    except OSError:
         raise HTTPException(status_code=404, detail="视频不存在")
 
     return FileResponse(
         path=file_path,
         media_type="video/mp4",
-        filename=filename
+        filename=filename,
+        stat_result=stat_result
     )
@@ -2,7 +2,7 @@
 服务模块包
 """
 
-from .image_service import image_service, ImageService
+from .image_service import image_service, ImageService, ImageQueueFullError
 from .video_service import video_service, VideoService, JobStatus
 from .prompt_service import prompt_service, PromptService
 from .history_service import history_service, HistoryService
@@ -10,6 +10,7 @@ from .history_service import history_service, HistoryService
 __all__ = [
     "image_service",
     "ImageService",
+    "ImageQueueFullError",
     "video_service",
     "VideoService",
     "JobStatus",
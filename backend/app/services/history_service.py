@@ -2,18 +2,90 @@
 历史记录服务模块
 
 该模块负责:
-- 保存生成历史记录到 JSON 文件
+- 以 JSON Lines 追加日志的形式保存生成历史记录
 - 读取和查询历史记录
 - 删除历史记录
 """
 
+import os
 import uuid
 import asyncio
+from dataclasses import dataclass, field
 from datetime import datetime, date
-from typing import List, Optional, Dict, Any
+from pathlib import Path
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 
 from ..config import Config, logger
-from ..utils import read_json_file, write_json_file
+from ..utils import (
+    read_json_file,
+    read_jsonl_file,
+    append_jsonl_file,
+    write_jsonl_file,
+)
+
+# 历史记录最多保留条数
+MAX_HISTORY_ITEMS: int = 1000
+# 追加日志允许超出保留上限的行数，超出后压缩重写文件
+HISTORY_COMPACT_SLACK: int = 100
+# 删除标记行的键名：删除记录时追加 {TOMBSTONE_KEY: 记录 ID}，读取时回放
+TOMBSTONE_KEY: str = "_tombstone"
+# 图库结果缓存的最大条目数，用于吸收分页/刷新产生的重复请求
+LIBRARY_CACHE_MAX_ENTRIES: int = 128
+
+
+@dataclass
+class HistorySnapshot:
+    """
+    已解析的历史记录快照
+
+    除完整列表外，按类型预先建立索引，
+    使按类型筛选的查询无需逐条扫描全部记录。
+
+    Attributes:
+        key: 文件缓存键 (mtime_ns, size)，文件不存在时为 None
+        items: 全部记录 (最新的在前)
+        by_type: 类型 -> 该类型的记录列表 (保持最新的在前)
+        by_id: 记录 ID -> 在 items 中的下标 (同 ID 取最新的一条)
+        line_count: 日志文件中的记录行数 (可能多于 items，用于判断何时压缩)
+        meta_maps: 按类型缓存的 filename -> 元数据映射 (首次使用时构建)
+    """
+    key: Optional[Tuple[int, int]]
+    items: List[Dict[str, Any]]
+    by_type: Dict[str, List[Dict[str, Any]]]
+    by_id: Dict[str, int]
+    line_count: int = 0
+    meta_maps: Dict[str, Dict[str, Dict[str, Any]]] = field(default_factory=dict)
+
+    @classmethod
+    def build(
+        cls,
+        key: Optional[Tuple[int, int]],
+        items: List[Dict[str, Any]],
+        line_count: Optional[int] = None
+    ) -> "HistorySnapshot":
+        """
+        根据记录列表构建快照
+
+        Args:
+            key: 文件缓存键
+            items: 历史记录列表 (最新的在前)
+            line_count: 日志文件行数 (可选，默认等于记录数)
+
+        Returns:
+            HistorySnapshot: 新快照
+        """
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        by_id: Dict[str, int] = {}
+        for index, item in enumerate(items):
+            by_type.setdefault(item.get("type"), []).append(item)
+            by_id.setdefault(item.get("id"), index)
+        return cls(
+            key=key,
+            items=items,
+            by_type=by_type,
+            by_id=by_id,
+            line_count=len(items) if line_count is None else line_count
+        )
 
 
 class HistoryService:
@@ -28,30 +100,288 @@ class HistoryService:
         初始化历史记录服务
         """
         self._history_file = Config.HISTORY_FILE
-        # 使用异步锁保护读写，避免并发写入导致 JSON 损坏
+        self._legacy_file = Config.LEGACY_HISTORY_FILE
+        self._prepared = False
+        # 使用异步锁保护读写，避免并发写入导致文件损坏
         self._lock = asyncio.Lock()
+        # 等待写入的新记录及其完成通知
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        # 已解析的历史记录快照，以文件 (mtime_ns, size) 作为失效键
+        self._snapshot: Optional[HistorySnapshot] = None
+        # 快照版本号，每次快照变化时递增，作为图库缓存键的一部分
+        self._generation = 0
+        # 图库结果缓存 {缓存键: 结果}，按最近使用顺序淘汰
+        self._library_cache: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+        # 输出目录扫描缓存 {目录: (目录 mtime_ns, [(文件名, 文件 mtime)])}
+        self._scan_cache: Dict[Path, Tuple[int, List[Tuple[str, float]]]] = {}
         logger.info("历史记录服务初始化完成")
 
+    def _stat_key(self) -> Optional[Tuple[int, int]]:
+        """
+        获取历史文件的缓存键
+
+        Returns:
+            Optional[Tuple[int, int]]: (mtime_ns, size)，文件不存在则返回 None
+        """
+        try:
+            st = self._history_file.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @staticmethod
+    def _replay_log(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        回放日志中的删除标记
+
+        Args:
+            records: 日志中的全部行 (按时间顺序)
+
+        Returns:
+            List[Dict[str, Any]]: 去除删除标记及被删除记录后的记录列表 (按时间顺序)
+        """
+        deleted = {
+            record[TOMBSTONE_KEY] for record in records if TOMBSTONE_KEY in record
+        }
+        if not deleted:
+            return records
+        return [
+            record for record in records
+            if TOMBSTONE_KEY not in record and record.get("id") not in deleted
+        ]
+
+    async def _migrate_legacy(self) -> None:
+        """
+        将旧版 history.json 迁移为 JSONL 追加日志
+
+        仅在 JSONL 文件尚不存在时执行，旧文件保留不动。
+        """
+        if self._history_file.exists() or not self._legacy_file.exists():
+            return
+
+        data = await read_json_file(self._legacy_file)
+        items = data.get("items", []) if data else []
+        # 旧文件为“新到旧”，日志按时间顺序追加，因此反转后写入
+        await write_jsonl_file(self._history_file, reversed(items))
+        logger.info("已将旧版历史记录迁移为 JSONL: %d 条", len(items))
+
+    async def _prepare(self) -> None:
+        """
+        进程内首次访问时的一次性准备
+
+        迁移旧版文件，并将日志压缩重写一次：回放删除标记、丢弃超出保留上限的旧行，
+        同时修复异常退出时可能留下的半行，保证后续追加从新行开始。
+        """
+        await self._migrate_legacy()
+        records = await read_jsonl_file(self._history_file)
+        if records is not None:
+            records = self._replay_log(records)
+            await self._save_history(records[-MAX_HISTORY_ITEMS:][::-1])
+
+    async def _get_snapshot(self) -> HistorySnapshot:
+        """
+        获取当前历史记录快照
+
+        文件未变化时直接复用缓存，避免重复读取和解析。
+        返回的快照只读，调用方不得原地修改其中的列表。
+
+        Returns:
+            HistorySnapshot: 历史记录快照
+        """
+        if not self._prepared:
+            self._prepared = True
+            await self._prepare()
+
+        key = self._stat_key()
+        if self._snapshot is not None and self._snapshot.key == key:
+            return self._snapshot
+
+        records: List[Dict[str, Any]] = []
+        if key is not None:
+            records = await read_jsonl_file(self._history_file) or []
+        # 日志按时间顺序追加，回放删除标记后取末尾的保留条数并反转为“新到旧”
+        items = self._replay_log(records)[-MAX_HISTORY_ITEMS:][::-1]
+        self._set_snapshot(HistorySnapshot.build(key, items, line_count=len(records)))
+        return self._snapshot
+
+    async def _read_snapshot(self) -> HistorySnapshot:
+        """
+        获取供只读查询使用的快照
+
+        快照不可变，写入方只会整体替换引用，因此快照仍有效时无需加锁；
+        文件发生变化需要重新加载时才与写入方串行。
+
+        Returns:
+            HistorySnapshot: 历史记录快照
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.key == self._stat_key():
+            return snapshot
+
+        async with self._lock:
+            return await self._get_snapshot()
+
+    def _set_snapshot(self, snapshot: HistorySnapshot) -> None:
+        """
+        替换当前快照并使依赖它的图库缓存失效
+
+        Args:
+            snapshot: 新快照
+        """
+        self._snapshot = snapshot
+        self._generation += 1
+
+    def _get_cached_library(self, cache_key: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+        """
+        读取图库缓存
+
+        Args:
+            cache_key: 缓存键 (需包含快照版本号与目录 mtime)
+
+        Returns:
+            Optional[Dict[str, Any]]: 缓存结果，不存在则返回 None
+        """
+        data = self._library_cache.pop(cache_key, None)
+        if data is not None:
+            # 重新插入到末尾，标记为最近使用
+            self._library_cache[cache_key] = data
+        return data
+
+    def _put_cached_library(self, cache_key: Tuple[Any, ...], data: Dict[str, Any]) -> None:
+        """
+        写入图库缓存，超出容量时淘汰最久未使用的条目
+
+        Args:
+            cache_key: 缓存键
+            data: 图库结果
+        """
+        if len(self._library_cache) >= LIBRARY_CACHE_MAX_ENTRIES:
+            self._library_cache.pop(next(iter(self._library_cache)))
+        self._library_cache[cache_key] = data
+
+    def _scan_directory(
+        self,
+        directory: Path,
+        suffixes: Tuple[str, ...]
+    ) -> Tuple[Optional[int], List[Tuple[str, float]]]:
+        """
+        扫描输出目录中的文件 (按目录 mtime 缓存)
+
+        目录中新增、删除或重命名文件都会更新目录的 mtime，
+        目录未变化时直接复用上次的扫描结果，跳过逐个文件的 stat。
+
+        Args:
+            directory: 要扫描的目录
+            suffixes: 允许的文件扩展名 (小写)
+
+        Returns:
+            Tuple[Optional[int], List[Tuple[str, float]]]: (目录 mtime_ns, 文件列表)，
+                文件列表为 (文件名, 文件修改时间)，按修改时间从新到旧；目录不存在时为 (None, [])
+        """
+        try:
+            dir_mtime = directory.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None, []
+
+        cached = self._scan_cache.get(directory)
+        if cached is not None and cached[0] == dir_mtime:
+            return cached
+
+        # 单次 scandir 遍历代替按扩展名多次 glob；DirEntry 自带文件类型，
+        # is_file() 通常无需额外系统调用
+        entries: List[Tuple[str, float]] = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if not entry.name.lower().endswith(suffixes) or not entry.is_file():
+                    continue
+
+                try:
+                    file_stat = entry.stat()
+                except OSError as exc:
+                    logger.warning("读取文件信息失败: %s, error=%s", entry.path, exc)
+                    continue
+
+                entries.append((entry.name, file_stat.st_mtime))
+
+        # 按修改时间倒序排列，图库分页可按顺序取满所需天数后提前结束
+        entries.sort(key=lambda item: item[1], reverse=True)
+        self._scan_cache[directory] = (dir_mtime, entries)
+        return dir_mtime, entries
+
     async def _load_history(self) -> List[Dict[str, Any]]:
         """
         加载历史记录
 
         Returns:
-            List[Dict[str, Any]]: 历史记录列表
+            List[Dict[str, Any]]: 历史记录列表 (快照的浅拷贝，可自由修改)
         """
-        data = await read_json_file(self._history_file)
-        if data is None:
-            return []
-        return data.get("items", [])
+        snapshot = await self._get_snapshot()
+        return list(snapshot.items)
 
     async def _save_history(self, items: List[Dict[str, Any]]) -> None:
         """
-        保存历史记录
+        整体重写历史记录 (删除、清空与压缩时使用)
+
+        Args:
+            items: 历史记录列表 (最新的在前)
+        """
+        await write_jsonl_file(self._history_file, reversed(items))
+        # 写入后刷新快照，下次读取无需重新解析
+        self._set_snapshot(HistorySnapshot.build(self._stat_key(), list(items)))
+
+    async def _append_history(self, records: List[Dict[str, Any]]) -> None:
+        """
+        追加一批历史记录
+
+        Args:
+            records: 新记录 (按时间顺序，最新的在后)
+        """
+        snapshot = await self._get_snapshot()
+        # 新记录在前，只拷贝仍在保留上限内的旧记录，避免先拼接再截断的两次复制
+        items = records[::-1]
+        items.extend(snapshot.items[:max(MAX_HISTORY_ITEMS - len(items), 0)])
+        del items[MAX_HISTORY_ITEMS:]
+        await self._append_lines(snapshot, records, items)
+
+    async def _append_lines(
+        self,
+        snapshot: HistorySnapshot,
+        lines: List[Dict[str, Any]],
+        items: List[Dict[str, Any]]
+    ) -> None:
+        """
+        向日志追加若干行并刷新快照
+
+        常规情况下只向日志末尾追加写入；超出保留上限的旧行与删除标记
+        累积到一定数量后再整体压缩重写。
 
         Args:
-            items: 历史记录列表
+            snapshot: 追加前的快照
+            lines: 要追加的日志行 (记录或删除标记)
+            items: 追加后的记录列表 (最新的在前)
+        """
+        line_count = snapshot.line_count + len(lines)
+
+        if line_count > MAX_HISTORY_ITEMS + HISTORY_COMPACT_SLACK:
+            await self._save_history(items)
+            return
+
+        await append_jsonl_file(self._history_file, lines)
+        self._set_snapshot(HistorySnapshot.build(self._stat_key(), items, line_count=line_count))
+
+    async def warm_cache(self) -> int:
         """
-        await write_json_file(self._history_file, {"items": items})
+        预热历史记录快照
+
+        在应用启动时调用，提前完成一次读取与解析，
+        使首个请求直接命中缓存。
+
+        Returns:
+            int: 已加载的记录数量
+        """
+        async with self._lock:
+            snapshot = await self._get_snapshot()
+        return len(snapshot.items)
 
     async def add_record(
         self,
@@ -83,22 +413,34 @@ class HistoryService:
             "params": params or {}
         }
 
-        # 使用锁确保读取与写入的原子性
-        async with self._lock:
-            # 加载现有记录
-            items = await self._load_history()
-
-            # 添加新记录到开头 (最新的在前)
-            items.insert(0, record)
+        # 先登记到待写队列，再竞争锁。持锁者一次性写入队列中的全部记录，
+        # 并发完成的任务因此合并为一次追加，其余调用方只需等待结果
+        done = asyncio.get_running_loop().create_future()
+        self._pending.append((record, done))
 
-            # 限制历史记录数量 (最多保留 1000 条)
-            if len(items) > 1000:
-                items = items[:1000]
-
-            # 保存
-            await self._save_history(items)
-
-        logger.info(f"添加历史记录: {record_id}, type={record_type}")
+        async with self._lock:
+            if self._pending:
+                batch, self._pending = self._pending, []
+                try:
+                    # 追加到日志末尾 (最多保留 MAX_HISTORY_ITEMS 条)
+                    await self._append_history([item for item, _ in batch])
+                except Exception as e:
+                    for _, future in batch:
+                        future.set_exception(e)
+                except BaseException:
+                    # 持锁者被取消时批次内其他调用方的结果无人设置，逐一通知后再继续取消，
+                    # 避免其永远等待 (写入可能已在线程中完成，无法确定是否落盘)
+                    for _, future in batch:
+                        if future is not done:
+                            future.set_exception(RuntimeError("历史记录写入被中断"))
+                    raise
+                else:
+                    for _, future in batch:
+                        future.set_result(None)
+
+        await done
+
+        logger.info("添加历史记录: %s, type=%s", record_id, record_type)
         return record_id
 
     async def get_history(
@@ -118,13 +460,14 @@ class HistoryService:
         Returns:
             tuple[List[Dict[str, Any]], int]: (记录列表, 总数)
         """
-        # 读取历史记录时也加锁，避免读写冲突
-        async with self._lock:
-            items = await self._load_history()
+        # 只读查询直接使用快照，仅在需要重新加载时加锁
+        snapshot = await self._read_snapshot()
 
-        # 按类型筛选
+        # 按类型筛选：直接使用快照中的类型索引
         if record_type:
-            items = [item for item in items if item.get("type") == record_type]
+            items = snapshot.by_type.get(record_type, [])
+        else:
+            items = snapshot.items
 
         total = len(items)
 
@@ -143,52 +486,33 @@ class HistoryService:
         Returns:
             Optional[Dict[str, Any]]: 记录数据，不存在则返回 None
         """
-        async with self._lock:
-            items = await self._load_history()
+        snapshot = await self._read_snapshot()
 
-        for item in items:
-            if item.get("id") == record_id:
-                return item
+        index = snapshot.by_id.get(record_id)
+        if index is None:
+            return None
+        return snapshot.items[index]
 
-        return None
-
-    async def get_image_library(
-        self,
-        days: int = 7,
-        before: Optional[date] = None,
-        limit_days: int = 7,
-        generation_mode: str = "standard"
-    ) -> Dict[str, Any]:
+    def _get_image_meta_map(self, snapshot: HistorySnapshot) -> Dict[str, Dict[str, str]]:
         """
-        获取按天分组的图像图库数据
+        获取 filename -> 图像元数据映射
 
-        数据来源策略：
-        1. 以 output/images 目录中的实际文件为准（保证刷新后不丢失）
-        2. 使用 history.json 为图片补全 prompt、aspect_ratio、resolution、image_model
+        映射随快照缓存，历史记录不变时图库请求无需重新遍历记录。
 
         Args:
-            days: 首次加载时返回最近多少天的数据
-            before: 分页锚点，只返回该日期之前（更早）的数据
-            limit_days: 分页时每次最多返回多少天
-            generation_mode: 图像筛选模式（standard/pro）
+            snapshot: 历史记录快照
 
         Returns:
-            Dict[str, Any]: 图库响应数据，包含:
-                - days: 按天分组的数据
-                - next_before: 下一页锚点
-                - total_images: 当前筛选条件下匹配的总图片数
+            Dict[str, Dict[str, str]]: 文件名到元数据的映射
         """
-        # 读取历史记录（带锁），避免读写并发导致读取中间态
-        async with self._lock:
-            history_items = await self._load_history()
+        cached = snapshot.meta_maps.get("image")
+        if cached is not None:
+            return cached
 
         # 构建 filename -> 元数据映射。
         # 历史记录默认是“新到旧”顺序，因此同名文件只保留第一条即可。
         image_meta_map: Dict[str, Dict[str, str]] = {}
-        for item in history_items:
-            if item.get("type") != "image":
-                continue
-
+        for item in snapshot.by_type.get("image", []):
             filename = item.get("filename")
             if not filename or filename in image_meta_map:
                 continue
@@ -203,33 +527,114 @@ class HistoryService:
                 "generation_mode": params.get("generation_mode") or "standard",
             }
 
-        image_entries: List[Dict[str, Any]] = []
+        snapshot.meta_maps["image"] = image_meta_map
+        return image_meta_map
 
-        # 以输出目录中的文件为准扫描图片，保证页面刷新后仍可回显。
-        # 同时支持 PNG/JPEG，避免专业模式选择 JPEG 时图库不可见。
-        image_patterns = ("*.png", "*.jpg", "*.jpeg")
-        image_paths = []
-        for pattern in image_patterns:
-            image_paths.extend(Config.IMAGES_DIR.glob(pattern))
+    def _get_video_meta_map(self, snapshot: HistorySnapshot) -> Dict[str, Dict[str, Any]]:
+        """
+        获取 filename -> 视频元数据映射
 
-        for image_path in image_paths:
-            if not image_path.is_file():
-                continue
+        映射随快照缓存，历史记录不变时图库请求无需重新遍历记录。
+
+        Args:
+            snapshot: 历史记录快照
+
+        Returns:
+            Dict[str, Dict[str, Any]]: 文件名到元数据的映射
+        """
+        cached = snapshot.meta_maps.get("video")
+        if cached is not None:
+            return cached
 
-            try:
-                file_stat = image_path.stat()
-            except OSError as exc:
-                logger.warning(f"读取图像文件信息失败: {image_path}, error={exc}")
+        # 构建 filename -> 元数据映射。
+        # 历史记录默认是“新到旧”顺序，因此同名文件只保留第一条即可。
+        video_meta_map: Dict[str, Dict[str, Any]] = {}
+        for item in snapshot.by_type.get("video", []):
+            filename = item.get("filename")
+            if not filename or filename in video_meta_map:
                 continue
 
-            created_at = datetime.fromtimestamp(file_stat.st_mtime)
-            created_day = created_at.date()
+            params = item.get("params") or {}
+            resolution = params.get("resolution") or "720p"
+            ratio = params.get("aspect_ratio") or "16:9"
+            mode = params.get("mode") or "text2vid"
 
-            # 分页逻辑：只返回 before 指定日期之前的数据（更早日期）
-            if before and created_day >= before:
+            video_meta_map[filename] = {
+                "prompt": item.get("prompt") or "",
+                "resolution": resolution,
+                "ratio": ratio,
+                "mode": mode,
+                "can_extend": resolution == "720p",
+                "video_id": params.get("job_id"),
+            }
+
+        snapshot.meta_maps["video"] = video_meta_map
+        return video_meta_map
+
+    async def get_image_library(
+        self,
+        days: int = 7,
+        before: Optional[date] = None,
+        limit_days: int = 7,
+        generation_mode: str = "standard"
+    ) -> Dict[str, Any]:
+        """
+        获取按天分组的图像图库数据
+
+        数据来源策略：
+        1. 以 output/images 目录中的实际文件为准（保证刷新后不丢失）
+        2. 使用历史记录为图片补全 prompt、aspect_ratio、resolution、image_model
+
+        Args:
+            days: 首次加载时返回最近多少天的数据
+            before: 分页锚点，只返回该日期之前（更早）的数据
+            limit_days: 分页时每次最多返回多少天
+            generation_mode: 图像筛选模式（standard/pro）
+
+        Returns:
+            Dict[str, Any]: 图库响应数据，包含:
+                - days: 按天分组的数据
+                - next_before: 下一页锚点
+                - total_images: 当前筛选条件下匹配的总图片数
+        """
+        # 读取历史记录快照，只读访问无需复制列表
+        snapshot = await self._read_snapshot()
+        generation = self._generation
+
+        # 以输出目录中的文件为准扫描图片，保证页面刷新后仍可回显。
+        # 同时支持 PNG/JPEG，避免专业模式选择 JPEG 时图库不可见。
+        # 目录遍历与 stat 放到线程中执行，避免阻塞事件循环。
+        dir_mtime, image_files = await asyncio.to_thread(
+            self._scan_directory, Config.IMAGES_DIR, (".png", ".jpg", ".jpeg")
+        )
+
+        # 相同参数的重复请求直接返回缓存，历史记录或图片目录变化后自动失效
+        cache_key = ("image", days, before, limit_days, generation_mode, generation, dir_mtime)
+        cached = self._get_cached_library(cache_key)
+        if cached is not None:
+            return cached
+
+        image_meta_map = self._get_image_meta_map(snapshot)
+
+        # 分页逻辑：只返回 before 指定日期之前的数据（更早日期）
+        cutoff = (
+            datetime.combine(before, datetime.min.time()).timestamp() if before else None
+        )
+        window_days = days if before is None else limit_days
+
+        # 扫描结果已按时间倒序，同一天内也按“新 -> 旧”展示。
+        # 取满 window_days 天后只继续计数，不再构建条目。
+        day_groups: List[Dict[str, Any]] = []
+        day_items: List[Dict[str, Any]] = []
+        current_day: Optional[str] = None
+        has_more = False
+        total_images = 0
+
+        for image_name, mtime in image_files:
+            if cutoff is not None and mtime >= cutoff:
                 continue
 
-            meta = image_meta_map.get(image_path.name, {})
+            meta = image_meta_map.get(image_name, {})
             entry_generation_mode = meta.get("generation_mode", "standard")
 
             # 图库逻辑隔离：
@@ -240,62 +645,44 @@ class HistoryService:
             if generation_mode == "standard" and entry_generation_mode == "pro":
                 continue
 
-            image_entries.append({
-                "id": image_path.name,
-                "filename": image_path.name,
-                "url": f"/api/image/{image_path.name}",
+            total_images += 1
+            if has_more:
+                continue
+
+            created_at = datetime.fromtimestamp(mtime)
+            day_key = created_at.date().isoformat()
+            if day_key != current_day:
+                if len(day_groups) == window_days:
+                    has_more = True
+                    continue
+                current_day = day_key
+                day_items = []
+                day_groups.append({
+                    "date": day_key,
+                    "items": day_items,
+                })
+
+            day_items.append({
+                "id": image_name,
+                "filename": image_name,
+                "url": f"/api/image/{image_name}",
                 "created_at": created_at,
                 "prompt": meta.get("prompt", ""),
                 "ratio": meta.get("ratio", "3:2"),
                 "resolution": meta.get("resolution", "未知"),
                 "image_model": meta.get("image_model", "unknown"),
-                "generation_mode": entry_generation_mode,
-                "date": created_day.isoformat(),
-            })
-
-        # 按文件时间倒序，保证同一天内也按“新 -> 旧”展示
-        image_entries.sort(key=lambda item: item["created_at"], reverse=True)
-        total_images = len(image_entries)
-
-        # 按天分组（依赖前面排序后的插入顺序）
-        grouped_by_day: Dict[str, List[Dict[str, Any]]] = {}
-        for entry in image_entries:
-            grouped_by_day.setdefault(entry["date"], []).append(entry)
-
-        day_keys = list(grouped_by_day.keys())
-        window_days = days if before is None else limit_days
-        selected_day_keys = day_keys[:window_days]
-
-        day_groups: List[Dict[str, Any]] = []
-        for day_key in selected_day_keys:
-            day_items = []
-            for item in grouped_by_day.get(day_key, []):
-                day_items.append({
-                    "id": item["id"],
-                    "filename": item["filename"],
-                    "url": item["url"],
-                    "created_at": item["created_at"],
-                    "prompt": item["prompt"],
-                    "ratio": item["ratio"],
-                    "resolution": item["resolution"],
-                    "image_model": item["image_model"],
-                })
-
-            day_groups.append({
-                "date": day_key,
-                "items": day_items,
             })
 
         # next_before 使用“当前返回的最后一天”，下一次请求传该值即可加载更早日期
-        next_before = None
-        if selected_day_keys and len(day_keys) > len(selected_day_keys):
-            next_before = selected_day_keys[-1]
+        next_before = day_groups[-1]["date"] if has_more else None
 
-        return {
+        result = {
             "days": day_groups,
             "next_before": next_before,
             "total_images": total_images,
         }
+        self._put_cached_library(cache_key, result)
+        return result
 
     async def get_video_library(
         self,
@@ -308,7 +695,7 @@ class HistoryService:
 
         数据来源策略：
         1. 以 output/videos 目录中的实际文件为准（保证刷新后不丢失）
-        2. 使用 history.json 为视频补全 prompt、分辨率、宽高比和模式
+        2. 使用历史记录为视频补全 prompt、分辨率、宽高比和模式
 
         Args:
             days: 首次加载时返回最近多少天的数据
@@ -321,60 +708,64 @@ class HistoryService:
                 - next_before: 下一页锚点
                 - total_videos: 当前筛选条件下匹配的视频总数
         """
-        # 读取历史记录（带锁），避免读写并发导致读取中间态
-        async with self._lock:
-            history_items = await self._load_history()
-
-        # 构建 filename -> 元数据映射。
-        # 历史记录默认是“新到旧”顺序，因此同名文件只保留第一条即可。
-        video_meta_map: Dict[str, Dict[str, Any]] = {}
-        for item in history_items:
-            if item.get("type") != "video":
-                continue
-
-            filename = item.get("filename")
-            if not filename or filename in video_meta_map:
-                continue
+        # 读取历史记录快照，只读访问无需复制列表
+        snapshot = await self._read_snapshot()
+        generation = self._generation
 
-            params = item.get("params") or {}
-            resolution = params.get("resolution") or "720p"
-            ratio = params.get("aspect_ratio") or "16:9"
-            mode = params.get("mode") or "text2vid"
-
-            video_meta_map[filename] = {
-                "prompt": item.get("prompt") or "",
-                "resolution": resolution,
-                "ratio": ratio,
-                "mode": mode,
-                "can_extend": resolution == "720p",
-                "video_id": params.get("job_id"),
-            }
+        # 以输出目录中的文件为准扫描视频，保证页面刷新后仍可回显。
+        # 目录遍历与 stat 放到线程中执行，避免阻塞事件循环。
+        dir_mtime, video_files = await asyncio.to_thread(
+            self._scan_directory, Config.VIDEOS_DIR, (".mp4",)
+        )
+
+        # 相同参数的重复请求直接返回缓存，历史记录或视频目录变化后自动失效
+        cache_key = ("video", days, before, limit_days, generation, dir_mtime)
+        cached = self._get_cached_library(cache_key)
+        if cached is not None:
+            return cached
+
+        video_meta_map = self._get_video_meta_map(snapshot)
+
+        # 分页逻辑：只返回 before 指定日期之前的数据（更早日期）
+        cutoff = (
+            datetime.combine(before, datetime.min.time()).timestamp() if before else None
+        )
+        window_days = days if before is None else limit_days
 
-        video_entries: List[Dict[str, Any]] = []
+        # 扫描结果已按时间倒序，同一天内也按“新 -> 旧”展示。
+        # 取满 window_days 天后只继续计数，不再构建条目。
+        day_groups: List[Dict[str, Any]] = []
+        day_items: List[Dict[str, Any]] = []
+        current_day: Optional[str] = None
+        has_more = False
+        total_videos = 0
 
-        # 以输出目录中的文件为准扫描视频，保证页面刷新后仍可回显。
-        for video_path in Config.VIDEOS_DIR.glob("*.mp4"):
-            if not video_path.is_file():
+        for video_name, mtime in video_files:
+            if cutoff is not None and mtime >= cutoff:
                 continue
 
-            try:
-                file_stat = video_path.stat()
-            except OSError as exc:
-                logger.warning(f"读取视频文件信息失败: {video_path}, error={exc}")
+            total_videos += 1
+            if has_more:
                 continue
 
-            created_at = datetime.fromtimestamp(file_stat.st_mtime)
-            created_day = created_at.date()
-
-            # 分页逻辑：只返回 before 指定日期之前的数据（更早日期）
-            if before and created_day >= before:
-                continue
+            created_at = datetime.fromtimestamp(mtime)
+            day_key = created_at.date().isoformat()
+            if day_key != current_day:
+                if len(day_groups) == window_days:
+                    has_more = True
+                    continue
+                current_day = day_key
+                day_items = []
+                day_groups.append({
+                    "date": day_key,
+                    "items": day_items,
+                })
 
-            meta = video_meta_map.get(video_path.name, {})
-            video_entries.append({
-                "id": video_path.name,
-                "filename": video_path.name,
-                "url": f"/api/video/{video_path.name}",
+            meta = video_meta_map.get(video_name, {})
+            day_items.append({
+                "id": video_name,
+                "filename": video_name,
+                "url": f"/api/video/{video_name}",
                 "created_at": created_at,
                 "prompt": meta.get("prompt", ""),
                 "resolution": meta.get("resolution", "720p"),
@@ -382,54 +773,18 @@ class HistoryService:
                 "mode": meta.get("mode", "text2vid"),
                 "can_extend": meta.get("can_extend", False),
                 "video_id": meta.get("video_id"),
-                "date": created_day.isoformat(),
-            })
-
-        # 按文件时间倒序，保证同一天内也按“新 -> 旧”展示
-        video_entries.sort(key=lambda item: item["created_at"], reverse=True)
-        total_videos = len(video_entries)
-
-        # 按天分组（依赖前面排序后的插入顺序）
-        grouped_by_day: Dict[str, List[Dict[str, Any]]] = {}
-        for entry in video_entries:
-            grouped_by_day.setdefault(entry["date"], []).append(entry)
-
-        day_keys = list(grouped_by_day.keys())
-        window_days = days if before is None else limit_days
-        selected_day_keys = day_keys[:window_days]
-
-        day_groups: List[Dict[str, Any]] = []
-        for day_key in selected_day_keys:
-            day_items = []
-            for item in grouped_by_day.get(day_key, []):
-                day_items.append({
-                    "id": item["id"],
-                    "filename": item["filename"],
-                    "url": item["url"],
-                    "created_at": item["created_at"],
-                    "prompt": item["prompt"],
-                    "resolution": item["resolution"],
-                    "ratio": item["ratio"],
-                    "mode": item["mode"],
-                    "can_extend": item["can_extend"],
-                    "video_id": item["video_id"],
-                })
-
-            day_groups.append({
-                "date": day_key,
-                "items": day_items,
             })
 
         # next_before 使用“当前返回的最后一天”，下一次请求传该值即可加载更早日期
-        next_before = None
-        if selected_day_keys and len(day_keys) > len(selected_day_keys):
-            next_before = selected_day_keys[-1]
+        next_before = day_groups[-1]["date"] if has_more else None
 
-        return {
+        result = {
             "days": day_groups,
             "next_before": next_before,
             "total_videos": total_videos,
         }
+        self._put_cached_library(cache_key, result)
+        return result
 
     async def delete_record(self, record_id: str) -> bool:
         """
@@ -441,18 +796,40 @@ class HistoryService:
         Returns:
             bool: 是否成功删除
         """
-        async with self._lock:
-            items = await self._load_history()
+        return await self.delete_records([record_id]) == 1
 
-            # 查找并删除
-            for i, item in enumerate(items):
-                if item.get("id") == record_id:
-                    del items[i]
-                    await self._save_history(items)
-                    logger.info(f"删除历史记录: {record_id}")
-                    return True
+    async def delete_records(self, record_ids: Iterable[str]) -> int:
+        """
+        批量删除历史记录
+
+        一次加锁、一次追加写入完成全部删除。
+
+        Args:
+            record_ids: 记录 ID 列表
 
-        return False
+        Returns:
+            int: 实际删除的记录数量
+        """
+        async with self._lock:
+            snapshot = await self._get_snapshot()
+
+            # 通过 ID 索引定位，不存在的 ID 直接忽略；全部不存在时无需写入
+            found = [
+                record_id for record_id in dict.fromkeys(record_ids)
+                if record_id in snapshot.by_id
+            ]
+            if not found:
+                return 0
+
+            deleted = set(found)
+            items = [item for item in snapshot.items if item.get("id") not in deleted]
+            # 追加删除标记而不是重写整个文件，标记在下次压缩时清除
+            await self._append_lines(
+                snapshot, [{TOMBSTONE_KEY: record_id} for record_id in found], items
+            )
+
+        logger.info("删除历史记录: %s", ", ".join(found))
+        return len(found)
 
     async def clear_history(self, record_type: Optional[str] = None) -> int:
         """
@@ -478,7 +855,7 @@ class HistoryService:
             await self._save_history(items)
 
             deleted_count = original_count - len(items)
-            logger.info(f"清空历史记录: 删除 {deleted_count} 条")
+            logger.info("清空历史记录: 删除 %d 条", deleted_count)
 
             return deleted_count
 
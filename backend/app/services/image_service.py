@@ -11,20 +11,30 @@
 import uuid
 import time
 import asyncio
+import copy
+import functools
+import hashlib
 import io
-from typing import List, Optional, Dict, Any
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Coroutine, List, Optional, Dict, Any, Set
 from dataclasses import dataclass
 from enum import Enum
 
 from google import genai
+from google.genai import errors as genai_errors
 from google.genai import types
 from PIL import Image as PILImage
 
 from ..config import Config, logger
 from ..utils import (
+    b64decode,
     generate_filename,
-    decode_base64_image,
+    get_genai_client,
     retry_async,
+    strip_data_url_prefix,
 )
 from .history_service import history_service
 
@@ -37,6 +47,32 @@ class JobStatus(str, Enum):
     FAILED = "failed"
 
 
+def _is_transient_error(exc: BaseException) -> bool:
+    """
+    判断 API 调用异常是否值得重试
+
+    参数错误、会话不存在以及除限流 (429) 外的 4xx 属于确定性失败，重试也不会成功，
+    直接抛出；超时、网络错误、服务端 5xx 等其余异常仍按临时故障重试。
+
+    Args:
+        exc: 捕获的异常
+
+    Returns:
+        bool: 是否值得重试
+    """
+    if isinstance(exc, genai_errors.ClientError):
+        return exc.code in {408, 429}
+    return not isinstance(exc, ValueError)
+
+
+class ImageQueueFullError(RuntimeError):
+    """排队中的图像生成任务已达上限，新任务被拒绝"""
+
+
+# 进行中 / 已结束的任务状态 (清理时逐任务判断，提升为模块常量避免每次重建集合)
+FINISHED_JOB_STATUSES = frozenset({JobStatus.COMPLETED, JobStatus.FAILED})
+
+
 # ==================== 图片模型能力定义 ====================
 
 # Nano Banana Pro 和 Nano Banana 2 的公共宽高比
@@ -89,8 +125,159 @@ IMAGE_SAFETY_CATEGORIES: List[types.HarmCategory] = [
     types.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
 ]
 
+# 各保存格式的文件头：API 返回的图像已是目标格式时可直接落盘，无需解码再编码
+IMAGE_FORMAT_SIGNATURES: Dict[str, bytes] = {
+    "PNG": b"\x89PNG\r\n\x1a\n",
+    "JPEG": b"\xff\xd8\xff",
+}
+
+# 谷歌搜索模式下，提示词已明确要求生成图像的关键词
+GOOGLE_SEARCH_IMAGE_KEYWORDS: List[str] = [
+    # 中文关键词
+    "生成", "创建", "制作", "绘制", "画", "可视化", "图表", "信息图",
+    "图片", "图像", "照片", "插图", "海报", "设计",
+    # 英文关键词
+    "generate", "create", "make", "draw", "paint", "visualize", "chart",
+    "infographic", "image", "picture", "photo", "illustration", "poster", "design"
+]
+
+# 关键词与中文字符检测预编译为正则，一次扫描即可完成匹配
+_IMAGE_KEYWORD_RE = re.compile(
+    "|".join(map(re.escape, GOOGLE_SEARCH_IMAGE_KEYWORDS)), re.IGNORECASE
+)
+_CJK_CHAR_RE = re.compile("[\u4e00-\u9fff]")
+
+# 可直接以原始字节上传的参考图格式，其余格式统一转为 PNG
+REFERENCE_IMAGE_MIME_TYPES = frozenset({"image/png", "image/jpeg", "image/webp"})
+
+# 参考图解码缓存上限 (条)，缓存的是压缩后的字节，单条占用与上传体积相当
+REFERENCE_IMAGE_CACHE_MAX_ENTRIES: int = 32
+
+
+@functools.lru_cache(maxsize=64)
+def _edit_config(aspect_ratio: str, resolution: str) -> types.GenerateContentConfig:
+    """
+    构建多轮编辑请求的配置 (按宽高比与分辨率缓存)
+
+    Args:
+        aspect_ratio: 宽高比
+        resolution: 分辨率
+
+    Returns:
+        types.GenerateContentConfig: SDK 配置对象
+    """
+    return types.GenerateContentConfig(
+        image_config=types.ImageConfig(
+            aspect_ratio=aspect_ratio,
+            image_size=resolution
+        )
+    )
+
+
+def _build_safety_settings(
+    safety_filter_level: Optional[str]
+) -> Optional[List[types.SafetySetting]]:
+    """
+    构建图片安全过滤配置
+
+    Args:
+        safety_filter_level: 前端安全过滤等级
 
-@dataclass
+    Returns:
+        Optional[List[types.SafetySetting]]: 可直接用于 GenerateContentConfig 的安全设置
+    """
+    if not safety_filter_level:
+        return None
+
+    threshold = SAFETY_FILTER_LEVEL_MAP.get(safety_filter_level)
+    if threshold is None:
+        raise ValueError(f"不支持的安全过滤等级: {safety_filter_level}")
+
+    safety_settings = [
+        types.SafetySetting(category=category, threshold=threshold)
+        for category in IMAGE_SAFETY_CATEGORIES
+    ]
+    logger.debug(
+        "专业生图安全过滤已启用兼容分类: level=%s, categories=%s",
+        safety_filter_level,
+        [setting.category for setting in safety_settings]
+    )
+    return safety_settings
+
+
+# SDK 发送请求前不会修改配置对象，相同参数的请求共享一份构建结果
+@functools.lru_cache(maxsize=64)
+def _generation_config(
+    aspect_ratio: str,
+    provider_image_size: str,
+    use_google_search: bool,
+    temperature: Optional[float],
+    top_p: Optional[float],
+    top_k: Optional[int],
+    presence_penalty: Optional[float],
+    frequency_penalty: Optional[float],
+    max_output_tokens: Optional[int],
+    seed: Optional[int],
+    safety_filter_level: Optional[str],
+) -> types.GenerateContentConfig:
+    """
+    构建图像生成请求的配置 (按参数组合缓存)
+
+    Args:
+        aspect_ratio: 宽高比
+        provider_image_size: provider 层图像尺寸
+        use_google_search: 是否开启 Google 搜索工具
+        temperature/top_p/top_k/presence_penalty/frequency_penalty/max_output_tokens: 采样参数
+        seed: 已规范化的随机种子 (None 表示由模型随机)
+        safety_filter_level: 安全过滤等级
+
+    Returns:
+        types.GenerateContentConfig: SDK 配置对象
+
+    Raises:
+        ValueError: 安全过滤等级不受支持时
+    """
+    image_config_kwargs: Dict[str, Any] = {
+        "aspect_ratio": aspect_ratio,
+        "image_size": provider_image_size,
+    }
+    # 注意：
+    # 1) Gemini `generate_content/chats` 链路当前不支持 `output_mime_type` 参数，
+    #    传入会触发 "output_mime_type parameter is not supported in Gemini API"。
+    # 2) 输出格式与压缩质量改为本地落盘阶段处理（PNG/JPEG 转码）。
+
+    config_kwargs: Dict[str, Any] = {
+        "response_modalities": ["TEXT", "IMAGE"],
+        "image_config": types.ImageConfig(**image_config_kwargs),
+    }
+
+    if use_google_search:
+        config_kwargs["tools"] = [{"google_search": {}}]
+
+    if temperature is not None:
+        config_kwargs["temperature"] = temperature
+    if top_p is not None:
+        config_kwargs["top_p"] = top_p
+    if top_k is not None:
+        config_kwargs["top_k"] = top_k
+    if presence_penalty is not None:
+        config_kwargs["presence_penalty"] = presence_penalty
+    if frequency_penalty is not None:
+        config_kwargs["frequency_penalty"] = frequency_penalty
+    if max_output_tokens is not None:
+        config_kwargs["max_output_tokens"] = max_output_tokens
+
+    if seed is not None:
+        config_kwargs["seed"] = seed
+
+    safety_settings = _build_safety_settings(safety_filter_level)
+    if safety_settings:
+        config_kwargs["safety_settings"] = safety_settings
+
+    return types.GenerateContentConfig(**config_kwargs)
+
+
+@dataclass(slots=True)
 class ImageJob:
     """
     图像生成任务数据类
@@ -103,10 +290,12 @@ class ImageJob:
         session_id: 会话ID
         error_message: 错误消息
         created_at: 创建时间戳
+        started_at: 开始处理时间戳 (排队结束后设置)
         prompt: 生成图像使用的提示词
         aspect_ratio: 生成图像使用的宽高比
         resolution: 生成图像使用的分辨率
         image_model: 生成图像使用的模型标识
+        revision: 状态版本号，进度、图像或状态变化时递增
     """
     job_id: str
     status: JobStatus
@@ -115,10 +304,12 @@ class ImageJob:
     session_id: Optional[str] = None
     error_message: Optional[str] = None
     created_at: float = 0
+    started_at: float = 0
     prompt: str = ""
     aspect_ratio: str = "3:2"
     resolution: str = "2K"
     image_model: str = "nano_banana_pro"
+    revision: int = 0
 
     def __post_init__(self):
         """初始化后处理"""
@@ -144,14 +335,152 @@ class ImageService:
 
         # 存储多轮对话会话 {session_id: chat_object}
         self._sessions: Dict[str, Any] = {}
-        # 会话最近活跃时间 {session_id: timestamp}
-        self._session_timestamps: Dict[str, float] = {}
+        # 会话最近活跃时间 {session_id: timestamp}，按活跃时间从旧到新排列，
+        # 过期清理与超量淘汰只需从头部弹出
+        self._session_timestamps: "OrderedDict[str, float]" = OrderedDict()
+        # 创建后又被继续编辑过的会话，超量淘汰时优先保留
+        self._reused_sessions: set[str] = set()
 
         # 存储图像生成任务 {job_id: ImageJob}
         self._jobs: Dict[str, ImageJob] = {}
+        # 运行中的后台任务 {job_id: Task}，持有引用以免任务被垃圾回收
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # 定时清理过期任务与会话的后台任务 (应用启动时由 start 创建)
+        self._cleanup_task: Optional[asyncio.Task] = None
+        # 等待任务状态变化的长轮询事件 {job_id: Event}，任务变化时唤醒并移除
+        self._job_waiters: Dict[str, asyncio.Event] = {}
+        # 同时执行的生成任务上限，超出的任务排队等待，避免突发请求占满线程池与内存
+        self._job_semaphore = asyncio.Semaphore(max(1, Config.MAX_CONCURRENT_IMAGE_JOBS))
+        # 运行与排队中的任务总数上限
+        self._max_inflight_jobs = max(1, Config.MAX_CONCURRENT_IMAGE_JOBS) + max(0, Config.MAX_QUEUED_IMAGE_JOBS)
+
+        # 参考图解码缓存 {内容摘要: Part}，按最近使用排序 (LRU)；
+        # 解码在线程池中并发执行，读写需加锁
+        self._reference_cache: "OrderedDict[bytes, types.Part]" = OrderedDict()
+        self._reference_cache_lock = threading.Lock()
+
+        # 专用线程池：API 调用可能阻塞数分钟，与默认线程池隔离，
+        # 避免并发任务占满默认线程池，拖慢文件读取等其他 to_thread 调用。
+        # 首次使用时创建，close 后再次使用 (同一进程内重新启动应用) 时重新创建
+        self._executor: Optional[ThreadPoolExecutor] = None
 
         logger.info("图像服务初始化完成")
 
+    def _run_blocking(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any
+    ) -> "asyncio.Future[Any]":
+        """
+        在图像服务专用线程池中执行阻塞调用
+
+        Args:
+            func: 阻塞函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            asyncio.Future[Any]: 可等待的执行结果
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=Config.GENAI_IMAGE_WORKERS,
+                thread_name_prefix="genai-image"
+            )
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def _run_queued(self, job: Coroutine[Any, Any, None]) -> None:
+        """
+        在任务并发上限内执行后台生成任务
+
+        Args:
+            job: 待执行的生成任务协程
+        """
+        try:
+            async with self._job_semaphore:
+                await job
+        finally:
+            # 排队期间被取消时协程从未启动，显式关闭以免告警
+            job.close()
+
+    def start(self) -> None:
+        """
+        启动定时清理后台任务 (应用启动时调用)，请求路径上不再执行全量清理
+        """
+        if self._cleanup_task is None:
+            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def _cleanup_loop(self) -> None:
+        """
+        按 Config.JOB_CLEANUP_INTERVAL_SECONDS 周期清理过期任务和会话
+        """
+        while True:
+            await asyncio.sleep(Config.JOB_CLEANUP_INTERVAL_SECONDS)
+            try:
+                self._cleanup_expired()
+            except Exception as e:
+                logger.warning(f"清理过期任务失败: {e}")
+
+    def close(self) -> None:
+        """
+        停止定时清理并关闭专用线程池 (应用关闭时调用)，不等待仍在进行的 API 调用；
+        之后再次使用时重新创建线程池
+        """
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+            self._cleanup_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _decode_reference_image(self, base64_data: str) -> types.Part:
+        """
+        将 base64 参考图解码为请求内容 Part (按内容摘要缓存)
+
+        反复生成/调整时前端会重复提交同一张参考图，命中缓存即可跳过解码。
+        常见格式直接以原始字节上传，避免 SDK 将 PIL 图像重新编码为 PNG。
+
+        Args:
+            base64_data: base64 编码的图像数据 (可包含 data URL 前缀)
+
+        Returns:
+            types.Part: 可直接放入请求内容的图像 Part
+
+        Raises:
+            ValueError: 如果解码失败
+        """
+        key = hashlib.blake2b(base64_data.encode(), digest_size=16).digest()
+        with self._reference_cache_lock:
+            part = self._reference_cache.get(key)
+            if part is not None:
+                self._reference_cache.move_to_end(key)
+                return part
+
+        try:
+            # 移除可能的 data URL 前缀
+            raw = b64decode(strip_data_url_prefix(base64_data))
+
+            # 仅读取文件头识别格式，不解码像素
+            with PILImage.open(io.BytesIO(raw)) as image:
+                mime_type = PILImage.MIME.get(image.format or "")
+                if mime_type not in REFERENCE_IMAGE_MIME_TYPES:
+                    buffer = io.BytesIO()
+                    image.save(buffer, format="PNG")
+                    raw, mime_type = buffer.getvalue(), "image/png"
+        except Exception as e:
+            logger.error(f"解码图像失败: {e}")
+            raise ValueError(f"无法解码图像: {e}")
+
+        part = types.Part.from_bytes(data=raw, mime_type=mime_type)
+        with self._reference_cache_lock:
+            self._reference_cache[key] = part
+            while len(self._reference_cache) > REFERENCE_IMAGE_CACHE_MAX_ENTRIES:
+                self._reference_cache.popitem(last=False)
+        return part
+
     def _ensure_client(self) -> genai.Client:
         """
         确保 Gemini 客户端可用
@@ -163,11 +492,8 @@ class ImageService:
             ValueError: 当 API Key 未配置时
         """
         if self.client is None:
-            if not Config.GOOGLE_CLOUD_API_KEY:
-                raise ValueError("GOOGLE_CLOUD_API_KEY 未设置")
-            # 延迟创建客户端，降低导入时失败的概率
-            self.client = genai.Client(api_key=Config.GOOGLE_CLOUD_API_KEY)
-            logger.info("Gemini 客户端已初始化")
+            # 与其他服务共享同一客户端，复用连接池
+            self.client = get_genai_client()
         return self.client
 
     def _optimize_prompt_for_google_search(self, prompt: str) -> tuple[str, bool]:
@@ -184,26 +510,12 @@ class ImageService:
             tuple[str, bool]: (优化后的提示词, 是否进行了优化)
         """
         # 检测是否已经包含图像生成关键词
-        image_keywords = [
-            # 中文关键词
-            "生成", "创建", "制作", "绘制", "画", "可视化", "图表", "信息图",
-            "图片", "图像", "照片", "插图", "海报", "设计",
-            # 英文关键词
-            "generate", "create", "make", "draw", "paint", "visualize", "chart",
-            "infographic", "image", "picture", "photo", "illustration", "poster", "design"
-        ]
-
-        prompt_lower = prompt.lower()
-        has_keyword = any(keyword in prompt_lower for keyword in image_keywords)
-
-        if has_keyword:
+        if _IMAGE_KEYWORD_RE.search(prompt):
             # 提示词已经明确要求生成图像，无需优化
             return prompt, False
 
         # 检测提示词语言（简单判断：是否包含中文字符）
-        has_chinese = any('\u4e00' <= char <= '\u9fff' for char in prompt)
-
-        if has_chinese:
+        if _CJK_CHAR_RE.search(prompt):
             # 中文提示词
             optimized = f"生成一张关于以下内容的信息图表：{prompt}"
         else:
@@ -334,37 +646,6 @@ class ImageService:
             return None
         return seed
 
-    def _build_safety_settings(
-        self,
-        safety_filter_level: Optional[str]
-    ) -> Optional[List[types.SafetySetting]]:
-        """
-        构建图片安全过滤配置
-
-        Args:
-            safety_filter_level: 前端安全过滤等级
-
-        Returns:
-            Optional[List[types.SafetySetting]]: 可直接用于 GenerateContentConfig 的安全设置
-        """
-        if not safety_filter_level:
-            return None
-
-        threshold = SAFETY_FILTER_LEVEL_MAP.get(safety_filter_level)
-        if threshold is None:
-            raise ValueError(f"不支持的安全过滤等级: {safety_filter_level}")
-
-        safety_settings = [
-            types.SafetySetting(category=category, threshold=threshold)
-            for category in IMAGE_SAFETY_CATEGORIES
-        ]
-        logger.debug(
-            "专业生图安全过滤已启用兼容分类: level=%s, categories=%s",
-            safety_filter_level,
-            [setting.category for setting in safety_settings]
-        )
-        return safety_settings
-
     def _build_generation_config(
         self,
         *,
@@ -385,6 +666,8 @@ class ImageService:
         """
         构建图像生成配置（普通 + 专业参数统一入口）
 
+        配置按参数组合缓存，每次返回缓存对象的浅拷贝，调用方修改字段不会影响其他请求。
+
         Args:
             aspect_ratio: 宽高比
             provider_image_size: provider 层图像尺寸
@@ -398,45 +681,19 @@ class ImageService:
         Returns:
             types.GenerateContentConfig: SDK 配置对象
         """
-        image_config_kwargs: Dict[str, Any] = {
-            "aspect_ratio": aspect_ratio,
-            "image_size": provider_image_size,
-        }
-        # 注意：
-        # 1) Gemini `generate_content/chats` 链路当前不支持 `output_mime_type` 参数，
-        #    传入会触发 "output_mime_type parameter is not supported in Gemini API"。
-        # 2) 输出格式与压缩质量改为本地落盘阶段处理（PNG/JPEG 转码）。
-
-        config_kwargs: Dict[str, Any] = {
-            "response_modalities": ["TEXT", "IMAGE"],
-            "image_config": types.ImageConfig(**image_config_kwargs),
-        }
-
-        if use_google_search:
-            config_kwargs["tools"] = [{"google_search": {}}]
-
-        if temperature is not None:
-            config_kwargs["temperature"] = temperature
-        if top_p is not None:
-            config_kwargs["top_p"] = top_p
-        if top_k is not None:
-            config_kwargs["top_k"] = top_k
-        if presence_penalty is not None:
-            config_kwargs["presence_penalty"] = presence_penalty
-        if frequency_penalty is not None:
-            config_kwargs["frequency_penalty"] = frequency_penalty
-        if max_output_tokens is not None:
-            config_kwargs["max_output_tokens"] = max_output_tokens
-
-        normalized_seed = self._normalize_seed(seed)
-        if normalized_seed is not None:
-            config_kwargs["seed"] = normalized_seed
-
-        safety_settings = self._build_safety_settings(safety_filter_level)
-        if safety_settings:
-            config_kwargs["safety_settings"] = safety_settings
-
-        return types.GenerateContentConfig(**config_kwargs)
+        return copy.copy(_generation_config(
+            aspect_ratio,
+            provider_image_size,
+            use_google_search,
+            temperature,
+            top_p,
+            top_k,
+            presence_penalty,
+            frequency_penalty,
+            max_output_tokens,
+            self._normalize_seed(seed),
+            safety_filter_level,
+        ))
 
     def _resolve_output_format(self, output_mime_type: Optional[str]) -> tuple[str, str]:
         """
@@ -475,49 +732,182 @@ class ImageService:
             image.save(file_path)
             return
 
+        # 返回数据已是目标格式且无需调整压缩质量时，直接写入原始字节，
+        # 跳过 PIL 解码与重新编码 (2K/4K PNG 编码耗时可达数百毫秒)
+        signature = IMAGE_FORMAT_SIGNATURES.get(output_format)
+        if (
+            signature is not None
+            and image_bytes.startswith(signature)
+            and (output_format != "JPEG" or output_compression_quality is None)
+        ):
+            with open(file_path, "wb") as f:
+                f.write(image_bytes)
+            return
+
+        # 解码后直接在原图上保存，不再额外复制一份像素缓冲 (4K 图像约 48MB)
         try:
-            with PILImage.open(io.BytesIO(image_bytes)) as loaded_image:
-                save_image = loaded_image.copy()
+            loaded_image = PILImage.open(io.BytesIO(image_bytes))
+            loaded_image.load()
         except Exception as exc:
             raise ValueError(f"解析生成图像失败: {exc}") from exc
 
-        # JPEG 不支持透明通道，先做模式转换避免保存失败
-        if output_format == "JPEG" and save_image.mode not in {"RGB", "L"}:
-            save_image = save_image.convert("RGB")
+        with loaded_image:
+            save_image = loaded_image
+            # JPEG 不支持透明通道，先做模式转换避免保存失败
+            if output_format == "JPEG" and save_image.mode not in {"RGB", "L"}:
+                save_image = save_image.convert("RGB")
+
+            save_kwargs: Dict[str, Any] = {"format": output_format}
+            if output_format == "JPEG" and output_compression_quality is not None:
+                save_kwargs["quality"] = output_compression_quality
+            elif output_format == "PNG":
+                # 低压缩等级编码速度快数倍，文件体积仅略有增加
+                save_kwargs["compress_level"] = 1
+            save_image.save(file_path, **save_kwargs)
+
+    @retry_async(max_retries=3, delay=2.0, jitter=0.2, retry_if=_is_transient_error)
+    async def _send_message(self, chat: Any, message: Any) -> Any:
+        """
+        在会话中发送一次生图请求
+
+        重试只作用于这一次请求，多图任务中已生成的图像不会被重新生成。
+
+        Args:
+            chat: 多轮对话会话
+            message: 请求内容
+
+        Returns:
+            Any: API 响应
+        """
+        return await self._run_with_timeout(chat.send_message, message, timeout_message="图像生成超时")
+
+    async def _run_with_timeout(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        timeout_message: str,
+        **kwargs: Any
+    ) -> Any:
+        """
+        在专用线程池中执行阻塞的 API 调用，超过 GENAI_IMAGE_TIMEOUT_SECONDS 时抛出超时
+
+        Args:
+            func: 阻塞函数
+            *args: 位置参数
+            timeout_message: 超时异常的提示文案
+            **kwargs: 关键字参数
+
+        Returns:
+            Any: 调用结果
 
-        save_kwargs: Dict[str, Any] = {"format": output_format}
-        if output_format == "JPEG" and output_compression_quality is not None:
-            save_kwargs["quality"] = output_compression_quality
-        save_image.save(file_path, **save_kwargs)
+        Raises:
+            TimeoutError: 调用超时
+        """
+        try:
+            async with asyncio.timeout(Config.GENAI_IMAGE_TIMEOUT_SECONDS):
+                return await self._run_blocking(func, *args, **kwargs)
+        except TimeoutError:
+            raise TimeoutError(timeout_message)
+
+    def _expire_stale_job(self, job: ImageJob, now: float) -> None:
+        """
+        将开始处理后超过 PROCESSING_JOB_MAX_SECONDS 仍未结束的任务标记为超时失败
+
+        排队中的 PENDING 任务不计时，避免等待并发名额的时间被算作处理超时。
+
+        Args:
+            job: 任务对象
+            now: 当前时间戳
+        """
+        if job.status == JobStatus.PROCESSING and now - job.started_at > Config.PROCESSING_JOB_MAX_SECONDS:
+            job.status = JobStatus.FAILED
+            job.error_message = "任务超时"
+            job.progress = min(job.progress, 99)
+            self._notify_job(job)
 
     def _cleanup_expired(self) -> None:
         """
         清理过期任务和会话，避免内存膨胀
+
+        由 _cleanup_loop 定时调用，请求路径只检查自身涉及的任务或会话。
         """
         now = time.time()
         job_ttl_seconds = Config.JOB_TTL_HOURS * 3600
         session_ttl_seconds = Config.SESSION_TTL_HOURS * 3600
 
-        # 清理过期任务
-        for job_id, job in list(self._jobs.items()):
+        # 清理过期任务：遍历时只收集待删除的 ID，不复制整张任务表
+        expired_jobs = []
+        for job_id, job in self._jobs.items():
             age = now - job.created_at
 
             # 处理超时的进行中任务
-            if job.status in {JobStatus.PENDING, JobStatus.PROCESSING} and age > Config.PROCESSING_JOB_MAX_SECONDS:
-                job.status = JobStatus.FAILED
-                job.error_message = "任务超时"
-                job.progress = min(job.progress, 99)
+            self._expire_stale_job(job, now)
 
             # 删除已完成或失败的历史任务
-            if job.status in {JobStatus.COMPLETED, JobStatus.FAILED} and age > job_ttl_seconds:
+            if job.status in FINISHED_JOB_STATUSES and age > job_ttl_seconds:
+                expired_jobs.append(job_id)
+        for job_id in expired_jobs:
+            del self._jobs[job_id]
+
+        # 任务数超出上限时按创建顺序淘汰已结束的任务，进行中的任务不受影响
+        excess = len(self._jobs) - Config.MAX_JOBS
+        if excess > 0:
+            finished = [
+                job_id for job_id, job in self._jobs.items()
+                if job.status in FINISHED_JOB_STATUSES
+            ]
+            for job_id in finished[:excess]:
                 del self._jobs[job_id]
 
-        # 清理过期会话
-        for session_id, last_active in list(self._session_timestamps.items()):
-            if now - last_active > session_ttl_seconds:
-                self._sessions.pop(session_id, None)
-                del self._session_timestamps[session_id]
-                logger.info(f"清理过期会话: {session_id}")
+        # 唤醒并移除已删除任务的长轮询等待者 (等待者醒来后会得到任务不存在)
+        for job_id in [job_id for job_id in self._job_waiters if job_id not in self._jobs]:
+            self._job_waiters.pop(job_id).set()
+
+        # 清理过期会话：从最久未活跃的一端开始，遇到未过期的会话即可停止
+        while self._session_timestamps:
+            session_id, last_active = next(iter(self._session_timestamps.items()))
+            if now - last_active <= session_ttl_seconds:
+                break
+            self._drop_session(session_id)
+            logger.info(f"清理过期会话: {session_id}")
+
+        # 会话数超出上限时淘汰最久未使用的会话。每次生图都会创建会话，
+        # 先淘汰从未被继续编辑的一次性会话，避免突发的生图请求挤掉正在编辑的会话
+        excess = len(self._session_timestamps) - Config.MAX_SESSIONS
+        if excess > 0:
+            victims = [
+                session_id for session_id in self._session_timestamps
+                if session_id not in self._reused_sessions
+            ][:excess]
+            if len(victims) < excess:
+                victims += [
+                    session_id for session_id in self._session_timestamps
+                    if session_id in self._reused_sessions
+                ][:excess - len(victims)]
+            for session_id in victims:
+                self._drop_session(session_id)
+                logger.info(f"会话数超出上限，清理最久未使用的会话: {session_id}")
+
+    def _drop_session(self, session_id: str) -> None:
+        """
+        移除会话及其活跃记录
+
+        Args:
+            session_id: 会话ID
+        """
+        self._sessions.pop(session_id, None)
+        self._session_timestamps.pop(session_id, None)
+        self._reused_sessions.discard(session_id)
+
+    def _touch_session(self, session_id: str) -> None:
+        """
+        更新会话活跃时间，并将其移到活跃顺序末尾
+
+        Args:
+            session_id: 会话ID
+        """
+        self._session_timestamps[session_id] = time.time()
+        self._session_timestamps.move_to_end(session_id)
 
     async def generate_images(
         self,
@@ -562,9 +952,14 @@ class ImageService:
 
         Returns:
             str: 任务ID
+
+        Raises:
+            ImageQueueFullError: 如果运行与排队中的任务数已达上限
         """
-        # 先清理过期任务，避免长期运行导致内存膨胀
-        self._cleanup_expired()
+        # 运行与排队中的任务都会持有参考图等数据，超出上限时直接拒绝，避免内存无限增长
+        if len(self._tasks) >= self._max_inflight_jobs:
+            raise ImageQueueFullError("当前图像生成任务过多，请稍后再试")
+
         provider_model, provider_image_size = self._resolve_image_generation_settings(
             image_model=image_model,
             resolution=resolution,
@@ -595,8 +990,8 @@ class ImageService:
         )
         self._jobs[job_id] = job
 
-        # 在后台启动生成任务
-        asyncio.create_task(
+        # 在后台启动生成任务 (超出并发上限时保持 PENDING 排队)
+        task = asyncio.create_task(self._run_queued(
             self._process_image_generation(
                 job_id=job_id,
                 prompt=prompt,
@@ -620,11 +1015,12 @@ class ImageService:
                 safety_filter_level=safety_filter_level,
                 reference_images=normalized_reference_images
             )
-        )
+        ))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
 
         return job_id
 
-    @retry_async(max_retries=3, delay=2.0)
     async def _process_image_generation(
         self,
         job_id: str,
@@ -670,9 +1066,14 @@ class ImageService:
             safety_filter_level: 安全过滤等级
             reference_images: 参考图像列表
         """
-        job = self._jobs[job_id]
+        job = self._jobs.get(job_id)
+        if job is None or job.status != JobStatus.PENDING:
+            # 排队期间任务已被清理或标记结束，不再执行
+            return
         job.status = JobStatus.PROCESSING
+        job.started_at = time.time()
         job.progress = 10
+        self._notify_job(job)
 
         try:
             logger.info(
@@ -685,7 +1086,7 @@ class ImageService:
             generated_files: List[str] = []
             session_id: Optional[str] = None
             output_extension, output_format = self._resolve_output_format(output_mime_type)
-            parallel_limit = 3
+            parallel_limit = max(1, Config.IMAGE_PARALLEL_LIMIT)
 
             # 如果使用谷歌搜索，优化提示词
             actual_prompt = prompt
@@ -701,11 +1102,17 @@ class ImageService:
             contents = [actual_prompt]
 
             # 如果有参考图像，按顺序添加到输入内容中
-            for index, reference_data in enumerate(reference_images, start=1):
-                logger.debug(f"添加第 {index}/{len(reference_images)} 张参考图到请求")
-                # 解码图像是 CPU 密集操作，放到线程中执行
-                ref_image = await asyncio.to_thread(decode_base64_image, reference_data)
-                contents.append(ref_image)
+            # 解码图像是 CPU 密集操作，放到线程中执行 (重复的参考图命中缓存)；多张参考图并行解码，
+            # gather 按传入顺序返回结果，保持参考图顺序不变
+            reference_count = len(reference_images)
+            if reference_images:
+                logger.debug(f"添加 {reference_count} 张参考图到请求")
+                contents.extend(await asyncio.gather(*(
+                    self._run_blocking(self._decode_reference_image, reference_data)
+                    for reference_data in reference_images
+                )))
+                # 参考图已转为请求内容，释放原始 base64 字符串，避免整个任务期间重复占用内存
+                reference_images.clear()
 
             # 构建配置（普通参数 + 专业参数统一映射）
             generation_config = self._build_generation_config(
@@ -759,41 +1166,39 @@ class ImageService:
                     try:
                         async with semaphore:
                             logger.debug(f"并发生图分片开始: job_id={job_id}, shard={index + 1}/{count}")
-                            try:
-                                local_chat = await asyncio.wait_for(
-                                    asyncio.to_thread(
-                                        client.chats.create,
-                                        model=provider_model,
-                                        config=generation_config
-                                    ),
-                                    timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-                                )
-                            except asyncio.TimeoutError:
-                                raise TimeoutError("图像生成初始化超时")
-
-                            try:
-                                response = await asyncio.wait_for(
-                                    asyncio.to_thread(local_chat.send_message, contents),
-                                    timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-                                )
-                            except asyncio.TimeoutError:
-                                raise TimeoutError("图像生成超时")
-
-                            for part in (response.parts or []):
-                                if part.inline_data is None:
-                                    continue
+                            # 创建会话只构造本地对象，不发起网络请求，无需放入线程池
+                            local_chat = client.chats.create(
+                                model=provider_model,
+                                config=generation_config
+                            )
 
-                                image = part.as_image()
-                                filename = generate_filename("image", output_extension)
-                                file_path = Config.IMAGES_DIR / filename
-                                await asyncio.to_thread(
+                            response = await self._send_message(local_chat, contents)
+
+                            # 单次响应可能包含多张图像，并发保存以重叠编码与磁盘写入
+                            images = [
+                                part.as_image()
+                                for part in (response.parts or [])
+                                if part.inline_data is not None
+                            ]
+                            filenames = [generate_filename("image", output_extension) for _ in images]
+                            results = await asyncio.gather(*(
+                                self._run_blocking(
                                     self._save_generated_image,
                                     image,
-                                    str(file_path),
+                                    str(Config.IMAGES_DIR / filename),
                                     output_format,
                                     output_compression_quality
                                 )
-                                local_files.append(filename)
+                                for image, filename in zip(images, filenames)
+                            ), return_exceptions=True)
+                            # 保留已成功保存的图像，再抛出首个保存错误 (记为部分成功)
+                            local_files.extend(
+                                filename for filename, result in zip(filenames, results)
+                                if not isinstance(result, Exception)
+                            )
+                            for result in results:
+                                if isinstance(result, Exception):
+                                    raise result
 
                             if not local_files:
                                 local_error = "API 未返回任何图像数据"
@@ -829,6 +1234,7 @@ class ImageService:
                                 logger.warning(
                                     f"并发分片失败: job_id={job_id}, shard={index + 1}/{count}, error={local_error}"
                                 )
+                            self._notify_job(job)
 
                 await asyncio.gather(*(run_single_request(i) for i in range(count)))
 
@@ -852,7 +1258,7 @@ class ImageService:
                 )
                 session_id = selected_session["session_id"]
                 self._sessions[session_id] = selected_session["chat"]
-                self._session_timestamps[session_id] = time.time()
+                self._touch_session(session_id)
                 job.session_id = session_id
 
                 if failed_count > 0:
@@ -864,57 +1270,87 @@ class ImageService:
             else:
                 # 非并发路径：保持现有行为（专业模式，或仅生成 1 张）
                 session_id = str(uuid.uuid4())
-                try:
-                    chat = await asyncio.wait_for(
-                        asyncio.to_thread(
-                            client.chats.create,
-                            model=provider_model,
-                            config=generation_config
-                        ),
-                        timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-                    )
-                except asyncio.TimeoutError:
-                    raise TimeoutError("图像生成初始化超时")
+                # 创建会话只构造本地对象，不发起网络请求，无需放入线程池
+                chat = client.chats.create(
+                    model=provider_model,
+                    config=generation_config
+                )
 
                 self._sessions[session_id] = chat
                 job.session_id = session_id
-                self._session_timestamps[session_id] = time.time()
+                self._touch_session(session_id)
 
-                for i in range(count):
-                    logger.debug(f"生成第 {i + 1}/{count} 张图像")
+                failed_details: List[str] = []
+                # 保存任务在后台进行，与下一次 API 请求重叠；持有引用直到全部完成
+                save_tasks: List[asyncio.Task] = []
+                saved_files: Set[str] = set()
 
-                    try:
-                        if i == 0:
-                            response = await asyncio.wait_for(
-                                asyncio.to_thread(chat.send_message, contents),
-                                timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-                            )
-                        else:
-                            response = await asyncio.wait_for(
-                                asyncio.to_thread(chat.send_message, f"再生成一张类似的图像: {actual_prompt}"),
-                                timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-                            )
-                    except asyncio.TimeoutError:
-                        raise TimeoutError("图像生成超时")
+                async def save_image(image: Any, filename: str) -> None:
+                    """
+                    保存单张图像，落盘后再对前端可见
 
-                    for part in (response.parts or []):
-                        if part.inline_data is None:
+                    Args:
+                        image: SDK 返回的图像对象
+                        filename: 目标文件名
+                    """
+                    await self._run_blocking(
+                        self._save_generated_image,
+                        image,
+                        str(Config.IMAGES_DIR / filename),
+                        output_format,
+                        output_compression_quality
+                    )
+                    # 保存完成顺序不定，对前端可见的列表始终按生成顺序排列
+                    saved_files.add(filename)
+                    job.images = [name for name in generated_files if name in saved_files]
+                    self._notify_job(job)
+                    logger.info(f"图像已保存: {filename} (已完成 {len(job.images)}/{count})")
+
+                # 后续请求的提示词固定不变，循环外构建一次
+                followup_message = f"再生成一张类似的图像: {actual_prompt}"
+                try:
+                    for i in range(count):
+                        logger.debug(f"生成第 {i + 1}/{count} 张图像")
+
+                        message = contents if i == 0 else followup_message
+                        try:
+                            response = await self._send_message(chat, message)
+                        except Exception as exc:
+                            # 首张失败时会话没有上下文，整体失败；
+                            # 后续单张失败则保留已生成的图像，继续生成剩余图像
+                            if i == 0:
+                                raise
+                            failed_details.append(f"第{i + 1}张: {exc}")
+                            logger.warning(f"第 {i + 1}/{count} 张图像生成失败: job_id={job_id}, error={exc}")
+                            job.progress = 20 + int((i + 1) / count * 70)
+                            self._notify_job(job)
                             continue
-                        image = part.as_image()
-                        filename = generate_filename("image", output_extension)
-                        file_path = Config.IMAGES_DIR / filename
-                        await asyncio.to_thread(
-                            self._save_generated_image,
-                            image,
-                            str(file_path),
-                            output_format,
-                            output_compression_quality
-                        )
-                        job.images.append(filename)
-                        generated_files.append(filename)
-                        logger.info(f"图像已保存: {filename} (已完成 {len(job.images)}/{count})")
-
-                    job.progress = 20 + int((i + 1) / count * 70)
+
+                        for part in (response.parts or []):
+                            if part.inline_data is None:
+                                continue
+                            filename = generate_filename("image", output_extension)
+                            # 文件名按生成顺序登记，保存结果在循环结束后统一等待
+                            generated_files.append(filename)
+                            save_tasks.append(
+                                asyncio.create_task(save_image(part.as_image(), filename))
+                            )
+
+                        job.progress = 20 + int((i + 1) / count * 70)
+                        self._notify_job(job)
+
+                    # 等待全部图像落盘；任一保存失败时整体失败，与逐张保存时一致
+                    await asyncio.gather(*save_tasks)
+                finally:
+                    # 生成或保存中途失败时取消仍在进行的保存任务并等待其结束，避免遗留孤立任务
+                    pending = [task for task in save_tasks if not task.done()]
+                    for task in pending:
+                        task.cancel()
+                    if pending:
+                        await asyncio.gather(*pending, return_exceptions=True)
+
+                # 全部落盘后按生成顺序确定最终图像列表
+                job.images = list(generated_files)
 
                 if not generated_files:
                     error_msg = "图像生成失败: API 未返回任何图像数据"
@@ -923,61 +1359,73 @@ class ImageService:
                     logger.error(error_msg)
                     raise Exception(error_msg)
 
-                success_count = len(generated_files)
-                failed_count = count - success_count
-                job.error_message = None
+                # 与并发路径一致，按请求计数（单次请求可能返回多张图像）
+                failed_count = len(failed_details)
+                success_count = count - failed_count
+                if failed_details:
+                    job.error_message = (
+                        f"部分图像生成失败: 成功 {success_count}/{count}，失败 {failed_count}"
+                    )
+                else:
+                    job.error_message = None
 
             # 生成完成（job.images 已经在循环中实时更新了）
             job.status = JobStatus.COMPLETED
             job.progress = 100
+            self._notify_job(job)
             logger.info(
                 f"图像生成完成: job_id={job_id}, mode={generation_mode}, total={count}, "
                 f"success={success_count}, failed={failed_count}"
             )
 
             # 保存历史记录 (生成完成后一次性写入)
-            try:
-                for filename in generated_files:
-                    await history_service.add_record(
-                        record_type="image",
-                        prompt=prompt,
-                        filename=filename,
-                        params={
-                            "image_model": image_model,
-                            "provider_model": provider_model,
-                            "aspect_ratio": aspect_ratio,
-                            "resolution": resolution,
-                            "provider_image_size": provider_image_size,
-                            "count": count,
-                            "generation_mode": generation_mode,
-                            "use_google_search": use_google_search,
-                            "temperature": temperature,
-                            "top_p": top_p,
-                            "top_k": top_k,
-                            "presence_penalty": presence_penalty,
-                            "frequency_penalty": frequency_penalty,
-                            "max_output_tokens": max_output_tokens,
-                            "seed": self._normalize_seed(seed),
-                            "output_mime_type": output_mime_type or "image/png",
-                            "output_compression_quality": output_compression_quality,
-                            "safety_filter_level": safety_filter_level,
-                            "reference_image_count": len(reference_images),
-                            "session_id": session_id,
-                            "parallel_mode": parallel_enabled,
-                            "parallel_limit": parallel_limit if parallel_enabled else 1,
-                            "request_count": count,
-                            "success_count": success_count,
-                            "failed_count": failed_count,
-                        }
-                    )
-            except Exception as history_error:
-                # 历史记录失败不影响主流程
-                logger.warning(f"保存图像历史记录失败: {history_error}")
+            # 各条记录并发提交，历史服务会将其合并为一次追加写入
+            history_params = {
+                "image_model": image_model,
+                "provider_model": provider_model,
+                "aspect_ratio": aspect_ratio,
+                "resolution": resolution,
+                "provider_image_size": provider_image_size,
+                "count": count,
+                "generation_mode": generation_mode,
+                "use_google_search": use_google_search,
+                "temperature": temperature,
+                "top_p": top_p,
+                "top_k": top_k,
+                "presence_penalty": presence_penalty,
+                "frequency_penalty": frequency_penalty,
+                "max_output_tokens": max_output_tokens,
+                "seed": self._normalize_seed(seed),
+                "output_mime_type": output_mime_type or "image/png",
+                "output_compression_quality": output_compression_quality,
+                "safety_filter_level": safety_filter_level,
+                "reference_image_count": reference_count,
+                "session_id": session_id,
+                "parallel_mode": parallel_enabled,
+                "parallel_limit": parallel_limit if parallel_enabled else 1,
+                "request_count": count,
+                "success_count": success_count,
+                "failed_count": failed_count,
+            }
+            results = await asyncio.gather(*(
+                history_service.add_record(
+                    record_type="image",
+                    prompt=prompt,
+                    filename=filename,
+                    params=dict(history_params)
+                )
+                for filename in generated_files
+            ), return_exceptions=True)
+            for filename, result in zip(generated_files, results):
+                if isinstance(result, Exception):
+                    # 历史记录失败不影响主流程
+                    logger.warning(f"保存图像历史记录失败: {filename}, error={result}")
 
         except Exception as e:
             # 生成失败
             job.status = JobStatus.FAILED
             job.error_message = str(e) or "图像生成失败"
+            self._notify_job(job)
             logger.error(f"图像生成失败: job_id={job_id}, error={e}")
 
     def get_job_status(self, job_id: str) -> Optional[ImageJob]:
@@ -990,11 +1438,58 @@ class ImageService:
         Returns:
             Optional[ImageJob]: 任务对象,如果不存在则返回None
         """
-        # 查询前清理过期任务
-        self._cleanup_expired()
+        job = self._jobs.get(job_id)
+        if job is not None:
+            # 只检查被查询的任务是否超时，全量清理由后台定时执行
+            self._expire_stale_job(job, time.time())
+        return job
+
+    def _notify_job(self, job: ImageJob) -> None:
+        """
+        递增任务状态版本号，并唤醒等待该任务变化的长轮询请求
+
+        Args:
+            job: 状态发生变化的任务
+        """
+        job.revision += 1
+        waiter = self._job_waiters.pop(job.job_id, None)
+        if waiter is not None:
+            waiter.set()
+
+    async def wait_for_update(
+        self,
+        job_id: str,
+        revision: int,
+        timeout: float
+    ) -> Optional[ImageJob]:
+        """
+        长轮询任务状态：等待任务版本号不同于 revision 后返回
+
+        任务已结束或版本号已变化时立即返回，否则最多等待 timeout 秒，
+        客户端可借此替代固定间隔的高频轮询。
+
+        Args:
+            job_id: 任务ID
+            revision: 客户端已知的状态版本号
+            timeout: 最长等待秒数
+
+        Returns:
+            Optional[ImageJob]: 任务对象,如果不存在则返回None
+        """
+        job = self.get_job_status(job_id)
+        if job is None or job.revision != revision or job.status in FINISHED_JOB_STATUSES:
+            return job
+
+        # 同一任务的多个长轮询共享一个事件，仅在首个等待者到来时创建
+        waiter = self._job_waiters.get(job_id)
+        if waiter is None:
+            waiter = self._job_waiters[job_id] = asyncio.Event()
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
         return self._jobs.get(job_id)
 
-    @retry_async(max_retries=3, delay=2.0)
     async def generate_images_sync(
         self,
         prompt: str,
@@ -1042,50 +1537,14 @@ class ImageService:
         Raises:
             Exception: 如果 API 调用失败
         """
-        # 同步生成前清理过期任务
-        self._cleanup_expired()
-        provider_model, provider_image_size = self._resolve_image_generation_settings(
+        # 与后台任务共用同一套生成流程，只是在当前协程中等待其完成
+        job_id = await self.generate_images(
+            prompt=prompt,
+            generation_mode=generation_mode,
             image_model=image_model,
-            resolution=resolution,
             aspect_ratio=aspect_ratio,
-        )
-        normalized_reference_images = self._normalize_reference_images(
-            reference_images=reference_images,
-            reference_image=reference_image,
-        )
-        logger.info(
-            f"开始生成图像: prompt={prompt[:50]}..., mode={generation_mode}, model={image_model}, "
-            f"provider_model={provider_model}, resolution={resolution}, "
-            f"provider_image_size={provider_image_size}, count={count}"
-        )
-
-        generated_files: List[str] = []
-        session_id = str(uuid.uuid4())
-        output_extension, output_format = self._resolve_output_format(output_mime_type)
-
-        # 如果使用谷歌搜索，优化提示词
-        actual_prompt = prompt
-        if use_google_search:
-            optimized_prompt, was_optimized = self._optimize_prompt_for_google_search(prompt)
-            if was_optimized:
-                logger.info(f"谷歌搜索提示词优化: '{prompt}' -> '{optimized_prompt}'")
-                actual_prompt = optimized_prompt
-            else:
-                logger.debug(f"提示词已包含图像生成关键词，无需优化: '{prompt}'")
-
-        # 构建请求内容
-        contents = [actual_prompt]
-
-        # 如果有参考图像，按顺序添加到输入内容中
-        for index, reference_data in enumerate(normalized_reference_images, start=1):
-            logger.debug(f"添加第 {index}/{len(normalized_reference_images)} 张参考图到请求")
-            ref_image = await asyncio.to_thread(decode_base64_image, reference_data)
-            contents.append(ref_image)
-
-        # 构建配置（普通参数 + 专业参数统一映射）
-        generation_config = self._build_generation_config(
-            aspect_ratio=aspect_ratio,
-            provider_image_size=provider_image_size,
+            resolution=resolution,
+            count=count,
             use_google_search=use_google_search,
             temperature=temperature,
             top_p=top_p,
@@ -1097,105 +1556,19 @@ class ImageService:
             output_mime_type=output_mime_type,
             output_compression_quality=output_compression_quality,
             safety_filter_level=safety_filter_level,
+            reference_images=reference_images,
+            reference_image=reference_image,
         )
+        task = self._tasks.get(job_id)
+        if task is not None:
+            await task
 
-        # 创建多轮对话会话
-        client = self._ensure_client()
-        try:
-            chat = await asyncio.wait_for(
-                asyncio.to_thread(
-                    client.chats.create,
-                    model=provider_model,
-                    config=generation_config
-                ),
-                timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-            )
-        except asyncio.TimeoutError:
-            raise TimeoutError("图像生成初始化超时")
-
-        # 存储会话
-        self._sessions[session_id] = chat
-        self._session_timestamps[session_id] = time.time()
-
-        # 生成指定数量的图像
-        for i in range(count):
-            logger.debug(f"生成第 {i + 1}/{count} 张图像")
-
-            # 发送请求
-            if i == 0:
-                try:
-                    response = await asyncio.wait_for(
-                        asyncio.to_thread(chat.send_message, contents),
-                        timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-                    )
-                except asyncio.TimeoutError:
-                    raise TimeoutError("图像生成超时")
-            else:
-                # 后续图像使用相同提示词
-                try:
-                    response = await asyncio.wait_for(
-                        asyncio.to_thread(chat.send_message, f"再生成一张类似的图像: {actual_prompt}"),
-                        timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-                    )
-                except asyncio.TimeoutError:
-                    raise TimeoutError("图像生成超时")
-
-            # 处理响应
-            for part in response.parts:
-                if part.inline_data is not None:
-                    # 获取图像数据
-                    image = part.as_image()
-
-                    # 生成文件名并保存
-                    filename = generate_filename("image", output_extension)
-                    file_path = Config.IMAGES_DIR / filename
-                    await asyncio.to_thread(
-                        self._save_generated_image,
-                        image,
-                        str(file_path),
-                        output_format,
-                        output_compression_quality
-                    )
-
-                    generated_files.append(filename)
-                    logger.info(f"图像已保存: {filename}")
-
-        logger.info(f"图像生成完成，共 {len(generated_files)} 张")
-        # 同步模式也写入历史记录，保持一致性
-        try:
-            for filename in generated_files:
-                await history_service.add_record(
-                    record_type="image",
-                    prompt=prompt,
-                    filename=filename,
-                    params={
-                        "image_model": image_model,
-                        "provider_model": provider_model,
-                        "aspect_ratio": aspect_ratio,
-                        "resolution": resolution,
-                        "provider_image_size": provider_image_size,
-                        "count": count,
-                        "generation_mode": generation_mode,
-                        "use_google_search": use_google_search,
-                        "temperature": temperature,
-                        "top_p": top_p,
-                        "top_k": top_k,
-                        "presence_penalty": presence_penalty,
-                        "frequency_penalty": frequency_penalty,
-                        "max_output_tokens": max_output_tokens,
-                        "seed": self._normalize_seed(seed),
-                        "output_mime_type": output_mime_type or "image/png",
-                        "output_compression_quality": output_compression_quality,
-                        "safety_filter_level": safety_filter_level,
-                        "reference_image_count": len(normalized_reference_images),
-                        "session_id": session_id,
-                    }
-                )
-        except Exception as history_error:
-            logger.warning(f"保存图像历史记录失败: {history_error}")
-        return generated_files, session_id
+        job = self._jobs[job_id]
+        if job.status == JobStatus.FAILED:
+            raise Exception(job.error_message or "图像生成失败")
+        return list(job.images), job.session_id
 
-    @retry_async(max_retries=3, delay=2.0)
+    @retry_async(max_retries=3, delay=2.0, jitter=0.2, retry_if=_is_transient_error)
     async def edit_image(
         self,
         session_id: str,
@@ -1222,45 +1595,35 @@ class ImageService:
         """
         logger.info(f"编辑图像: session_id={session_id}, prompt={prompt[:50]}...")
 
-        # 获取会话
-        # 编辑前清理过期会话，避免使用无效会话
-        self._cleanup_expired()
+        # 获取会话：已过期但尚未被定时清理的会话视为不存在，避免使用无效会话
+        last_active = self._session_timestamps.get(session_id)
+        if last_active is not None and time.time() - last_active > Config.SESSION_TTL_HOURS * 3600:
+            self.close_session(session_id)
         chat = self._sessions.get(session_id)
         if chat is None:
             raise ValueError(f"会话不存在: {session_id}")
 
-        generated_files: List[str] = []
-
         # 发送编辑请求
-        try:
-            response = await asyncio.wait_for(
-                asyncio.to_thread(
-                    chat.send_message,
-                    prompt,
-                    config=types.GenerateContentConfig(
-                        image_config=types.ImageConfig(
-                            aspect_ratio=aspect_ratio,
-                            image_size=resolution
-                        )
-                    )
-                ),
-                timeout=Config.GENAI_IMAGE_TIMEOUT_SECONDS
-            )
-        except asyncio.TimeoutError:
-            raise TimeoutError("图像编辑超时")
-
-        # 处理响应
-        for part in response.parts:
-            if part.inline_data is not None:
-                image = part.as_image()
-                filename = generate_filename("image", "png")
-                file_path = Config.IMAGES_DIR / filename
-                await asyncio.to_thread(image.save, str(file_path))
-                generated_files.append(filename)
-                logger.info(f"编辑后的图像已保存: {filename}")
-
-        # 更新会话活跃时间，避免被误清理
-        self._session_timestamps[session_id] = time.time()
+        response = await self._run_with_timeout(
+            chat.send_message,
+            prompt,
+            config=copy.copy(_edit_config(aspect_ratio, resolution)),
+            timeout_message="图像编辑超时"
+        )
+
+        # 处理响应：收集全部图像后并发保存
+        images = [part.as_image() for part in response.parts if part.inline_data is not None]
+        generated_files: List[str] = [generate_filename("image", "png") for _ in images]
+        await asyncio.gather(*(
+            self._run_blocking(image.save, str(Config.IMAGES_DIR / filename))
+            for image, filename in zip(images, generated_files)
+        ))
+        for filename in generated_files:
+            logger.info(f"编辑后的图像已保存: {filename}")
+
+        # 更新会话活跃时间，避免被误清理；标记为多次使用的会话，超量淘汰时优先保留
+        self._touch_session(session_id)
+        self._reused_sessions.add(session_id)
         return generated_files
 
     def close_session(self, session_id: str) -> bool:
@@ -1274,8 +1637,7 @@ class ImageService:
             bool: 是否成功关闭
         """
         if session_id in self._sessions:
-            del self._sessions[session_id]
-            self._session_timestamps.pop(session_id, None)
+            self._drop_session(session_id)
             logger.info(f"会话已关闭: {session_id}")
             return True
         return False
@@ -11,7 +11,48 @@ from google import genai
 from google.genai import types
 
 from ..config import Config, logger
-from ..utils import retry_async
+from ..utils import get_genai_client, retry_async
+
+
+# 图像提示词优化的系统提示
+IMAGE_SYSTEM_PROMPT = """你是一个专业的 AI 图像生成提示词优化专家。
+你的任务是将用户的简单描述扩展为详细的、适合 AI 图像生成的提示词。
+
+优化规则:
+1. 保持原始意图不变
+2. 添加视觉细节描述 (光线、色彩、构图、风格)
+3. 使用英文输出 (AI 图像生成模型对英文效果更好)
+4. 控制在 200 词以内
+5. 不要添加负面提示词
+6. 描述要具体、生动、有画面感
+
+直接输出优化后的提示词，不要有任何解释或前缀。"""
+
+# 视频提示词优化的系统提示
+VIDEO_SYSTEM_PROMPT = """你是一个专业的 AI 视频生成提示词优化专家。
+你的任务是将用户的简单描述扩展为详细的、适合 AI 视频生成的提示词。
+
+优化规则:
+1. 保持原始意图不变
+2. 添加动作描述 (运动方向、速度、镜头移动)
+3. 添加场景细节 (环境、光线、氛围)
+4. 使用英文输出 (AI 视频生成模型对英文效果更好)
+5. 控制在 200 词以内
+6. 描述要有时间顺序感，适合视频叙事
+
+直接输出优化后的提示词，不要有任何解释或前缀。"""
+
+# 各目标类型的请求配置只依赖固定的系统提示，模块加载时构建一次，各请求共享
+_PROMPT_CONFIGS = {
+    "image": types.GenerateContentConfig(
+        system_instruction=IMAGE_SYSTEM_PROMPT,
+        thinking_config=types.ThinkingConfig(thinking_level="low")
+    ),
+    "video": types.GenerateContentConfig(
+        system_instruction=VIDEO_SYSTEM_PROMPT,
+        thinking_config=types.ThinkingConfig(thinking_level="low")
+    ),
+}
 
 
 class PromptService:
@@ -41,10 +82,8 @@ class PromptService:
             ValueError: 当 API Key 未配置时
         """
         if self.client is None:
-            if not Config.GOOGLE_CLOUD_API_KEY:
-                raise ValueError("GOOGLE_CLOUD_API_KEY 未设置")
-            self.client = genai.Client(api_key=Config.GOOGLE_CLOUD_API_KEY)
-            logger.info("Gemini 客户端已初始化")
+            # 与其他服务共享同一客户端，复用连接池
+            self.client = get_genai_client()
         return self.client
 
     @retry_async(max_retries=2, delay=1.0)
@@ -72,46 +111,17 @@ class PromptService:
         """
         logger.info(f"开始优化提示词: {prompt[:50]}...")
 
-        # 根据目标类型构建系统提示
-        if target_type == "image":
-            system_prompt = """你是一个专业的 AI 图像生成提示词优化专家。
-你的任务是将用户的简单描述扩展为详细的、适合 AI 图像生成的提示词。
-
-优化规则:
-1. 保持原始意图不变
-2. 添加视觉细节描述 (光线、色彩、构图、风格)
-3. 使用英文输出 (AI 图像生成模型对英文效果更好)
-4. 控制在 200 词以内
-5. 不要添加负面提示词
-6. 描述要具体、生动、有画面感
-
-直接输出优化后的提示词，不要有任何解释或前缀。"""
-        else:
-            system_prompt = """你是一个专业的 AI 视频生成提示词优化专家。
-你的任务是将用户的简单描述扩展为详细的、适合 AI 视频生成的提示词。
-
-优化规则:
-1. 保持原始意图不变
-2. 添加动作描述 (运动方向、速度、镜头移动)
-3. 添加场景细节 (环境、光线、氛围)
-4. 使用英文输出 (AI 视频生成模型对英文效果更好)
-5. 控制在 200 词以内
-6. 描述要有时间顺序感，适合视频叙事
-
-直接输出优化后的提示词，不要有任何解释或前缀。"""
+        # 按目标类型选择预先构建的配置 (系统提示与思考配置固定不变)
+        config = _PROMPT_CONFIGS["image" if target_type == "image" else "video"]
 
         # 调用 Gemini API
         client = self._ensure_client()
-        # 提示词优化调用为阻塞操作，放线程执行并设置超时
+        # 使用 SDK 的原生异步接口，不占用线程池；设置超时避免请求悬挂
         response = await asyncio.wait_for(
-            asyncio.to_thread(
-                client.models.generate_content,
+            client.aio.models.generate_content(
                 model=Config.PROMPT_MODEL,
                 contents=f"请优化以下提示词:\n\n{prompt}",
-                config=types.GenerateContentConfig(
-                    system_instruction=system_prompt,
-                    thinking_config=types.ThinkingConfig(thinking_level="low")
-                )
+                config=config
             ),
             timeout=Config.GENAI_PROMPT_TIMEOUT_SECONDS
         )
@@ -9,11 +9,18 @@
 
 import uuid
 import asyncio
+import functools
+import hashlib
+import heapq
+import random
 import time
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Coroutine, Optional, Dict, Any, List, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+import orjson
 from google import genai
 from google.genai import types
 
@@ -22,6 +29,7 @@ from ..utils import (
     generate_filename,
     save_video_from_bytes,
     decode_base64_to_image_bytes,
+    get_genai_client,
     retry_async,
     RetryContext,
 )
@@ -36,7 +44,78 @@ class JobStatus(Enum):
     FAILED = "failed"
 
 
-@dataclass
+# 进行中与已结束的任务状态集合
+ACTIVE_JOB_STATUSES = frozenset({JobStatus.PENDING, JobStatus.PROCESSING})
+FINISHED_JOB_STATUSES = frozenset({JobStatus.COMPLETED, JobStatus.FAILED})
+
+# 操作状态轮询间隔：从 1 秒开始按 1.5 倍递增，上限 30 秒，附加 ±20% 抖动
+POLL_INITIAL_DELAY_SECONDS = 1.0
+POLL_MAX_DELAY_SECONDS = 30.0
+POLL_BACKOFF = 1.5
+POLL_JITTER = 0.2
+
+
+@functools.lru_cache(maxsize=64)
+def _generation_config(
+    aspect_ratio: str,
+    resolution: str,
+    duration_seconds: str
+) -> types.GenerateVideosConfig:
+    """
+    构建不含尾帧的视频生成配置 (按参数组合缓存)
+
+    Args:
+        aspect_ratio: 宽高比
+        resolution: 分辨率
+        duration_seconds: 视频秒数
+
+    Returns:
+        types.GenerateVideosConfig: SDK 配置对象
+    """
+    return types.GenerateVideosConfig(
+        aspect_ratio=aspect_ratio,
+        resolution=resolution,
+        duration_seconds=duration_seconds
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def _extension_config(aspect_ratio: str) -> types.GenerateVideosConfig:
+    """
+    构建视频延长配置 (按宽高比缓存，延长仅支持 720p)
+
+    Args:
+        aspect_ratio: 宽高比
+
+    Returns:
+        types.GenerateVideosConfig: SDK 配置对象
+    """
+    return types.GenerateVideosConfig(
+        number_of_videos=1,
+        resolution="720p",
+        aspect_ratio=aspect_ratio
+    )
+
+
+def _video_reference(video: types.Video) -> types.Video:
+    """
+    提取延长视频所需的轻量引用，释放已下载的视频字节
+
+    Gemini API 延长视频时只按 uri 引用原视频 (SDK 会丢弃同时存在的 video_bytes)，
+    保留完整对象只会让整段 MP4 随任务常驻内存直到过期。
+
+    Args:
+        video: 生成结果中的视频对象
+
+    Returns:
+        types.Video: 仅含 uri 与 mime 类型的视频引用；没有 uri 时返回原对象
+    """
+    if not video.uri:
+        return video
+    return types.Video(uri=video.uri, mime_type=video.mime_type)
+
+
+@dataclass(slots=True)
 class VideoJob:
     """
     视频生成任务数据类
@@ -86,9 +165,33 @@ class VideoService:
         # 存储视频生成任务 {job_id: VideoJob}
         self._jobs: Dict[str, VideoJob] = {}
 
+        # 按创建时间排序的任务小顶堆 [(created_at, job_id)]，清理时只需检查堆顶
+        self._expiry_heap: List[Tuple[float, str]] = []
+
         # 存储已生成的视频对象 (用于视频延长)
         self._generated_videos: Dict[str, Any] = {}
 
+        # 已完成生成结果缓存 {请求摘要: (文件名, 视频对象, 写入时间)}，按最近使用排序
+        self._result_cache: "OrderedDict[str, Tuple[str, Any, float]]" = OrderedDict()
+
+        # 后台任务 {job_id: Task}，保持强引用避免任务在运行中被回收
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+        # 下载阶段并发上限：每个下载会在内存中持有完整的 MP4，
+        # 避免多个任务同时完成时内存峰值叠加
+        self._download_semaphore = asyncio.Semaphore(max(1, Config.VIDEO_DOWNLOAD_CONCURRENCY))
+
+        # 进行中的生成请求 {请求摘要: Future[(文件名, 视频对象)]}，相同请求共享一次 API 调用
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # 专用线程池：下载与写盘、状态轮询、帧图像解码等阻塞调用与默认线程池隔离，
+        # 避免并发视频任务占满默认线程池，拖慢其他接口的 to_thread 调用。
+        # 首次使用时创建，close 后再次使用 (同一进程内重新启动应用) 时重新创建
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # 上次全量清理时间，状态轮询时按间隔节流，避免每次查询都遍历全部任务
+        self._last_cleanup: float = 0.0
+
         logger.info("视频服务初始化完成")
 
     def _ensure_client(self) -> genai.Client:
@@ -102,33 +205,322 @@ class VideoService:
             ValueError: 当 API Key 未配置时
         """
         if self.client is None:
-            if not Config.GOOGLE_CLOUD_API_KEY:
-                raise ValueError("GOOGLE_CLOUD_API_KEY 未设置")
-            self.client = genai.Client(api_key=Config.GOOGLE_CLOUD_API_KEY)
-            logger.info("Gemini 客户端已初始化")
+            # 与其他服务共享同一客户端，复用连接池
+            self.client = get_genai_client()
         return self.client
 
-    def _cleanup_expired(self) -> None:
+    def _run_blocking(
+        self,
+        func: Callable[..., Any],
+        *args: Any,
+        **kwargs: Any
+    ) -> "asyncio.Future[Any]":
         """
-        清理过期任务与缓存视频，避免内存占用持续增长
+        在视频服务专用线程池中执行阻塞调用
+
+        Args:
+            func: 阻塞函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+
+        Returns:
+            asyncio.Future[Any]: 可等待的执行结果
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=Config.GENAI_VIDEO_WORKERS,
+                thread_name_prefix="genai-video"
+            )
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    def _spawn(self, job_id: str, coroutine: Coroutine[Any, Any, None]) -> None:
+        """
+        在后台启动任务协程并登记，结束后自动移除
+
+        Args:
+            job_id: 任务 ID
+            coroutine: 后台执行的协程
+        """
+        task = asyncio.create_task(coroutine)
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def _decode_frame(self, base64_data: str) -> Tuple[bytes, str]:
+        """
+        在专用线程池中解码帧图像并规范化为 PNG
+
+        Args:
+            base64_data: base64 编码的图像数据
+
+        Returns:
+            Tuple[bytes, str]: (图像字节, mime 类型)
+
+        Raises:
+            ValueError: 如果解码失败
+        """
+        return await self._run_blocking(decode_base64_to_image_bytes, base64_data)
+
+    def close(self) -> None:
+        """
+        关闭专用线程池 (应用关闭时调用)，不等待仍在进行的 API 调用；之后再次使用时重新创建
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _follow_inflight(self, job: VideoJob, inflight: asyncio.Future) -> None:
+        """
+        等待相同请求的生成结果并同步到当前任务 (后台运行)
+
+        Args:
+            job: 当前任务对象
+            inflight: 进行中请求的结果 Future
+        """
+        job.status = JobStatus.PROCESSING
+        job.progress = 10
+        try:
+            filename, video = await asyncio.shield(inflight)
+        except Exception as e:
+            job.status = JobStatus.FAILED
+            job.error_message = str(e)
+            return
+
+        self._generated_videos[job.job_id] = video
+        job.status = JobStatus.COMPLETED
+        job.progress = 100
+        job.video_filename = filename
+
+        # 共享结果的任务同样写入历史记录
+        await self._add_history_record(
+            job.job_id, job.prompt, filename, job.mode, job.aspect_ratio, job.resolution
+        )
+
+    def _settle_inflight(
+        self,
+        cache_key: Optional[str],
+        result: Optional[Tuple[str, Any]] = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """
+        结束进行中的生成请求，并将结果或异常传递给等待中的相同请求
+
+        Args:
+            cache_key: 请求缓存键
+            result: 成功时的 (文件名, 视频对象)
+            error: 失败时的异常
+        """
+        inflight = self._inflight.pop(cache_key, None) if cache_key else None
+        if inflight is None or inflight.done():
+            return
+        if error is not None:
+            inflight.set_exception(error)
+            # 没有等待者时标记异常已读取，避免 "never retrieved" 告警
+            inflight.exception()
+        else:
+            inflight.set_result(result)
+
+    def _add_job(self, job: VideoJob) -> None:
+        """
+        登记新任务并加入过期堆
+
+        Args:
+            job: 任务对象
+        """
+        self._jobs[job.job_id] = job
+        heapq.heappush(self._expiry_heap, (job.created_at, job.job_id))
+
+    def _expire_stale_job(self, job: VideoJob, now: float) -> None:
+        """
+        将超过 PROCESSING_JOB_MAX_SECONDS 仍未结束的任务标记为超时失败
+
+        Args:
+            job: 任务对象
+            now: 当前时间戳
+        """
+        if job.status in ACTIVE_JOB_STATUSES and now - job.created_at > Config.PROCESSING_JOB_MAX_SECONDS:
+            job.status = JobStatus.FAILED
+            job.error_message = "任务超时"
+            job.progress = min(job.progress, 99)
+
+    def _drain_expired(self, max_age_seconds: float, finished_only: bool) -> int:
+        """
+        从过期堆顶开始移除创建时间超过 max_age_seconds 的任务
+
+        只访问已到期的堆顶条目，遇到未到期的任务即停止；
+        已被移除的任务在出堆时跳过 (惰性删除)。
+
+        Args:
+            max_age_seconds: 最大保留时间 (秒)
+            finished_only: 为 True 时仅移除已结束的任务，进行中的任务重新入堆
+
+        Returns:
+            int: 移除的任务数量
         """
         now = time.time()
-        job_ttl_seconds = Config.JOB_TTL_HOURS * 3600
+        removed = 0
+        still_active: List[Tuple[float, str]] = []
+
+        while self._expiry_heap and now - self._expiry_heap[0][0] > max_age_seconds:
+            entry = heapq.heappop(self._expiry_heap)
+            created_at, job_id = entry
+            job = self._jobs.get(job_id)
+            if job is None or job.created_at != created_at:
+                continue
+
+            self._expire_stale_job(job, now)
+            if finished_only and job.status not in FINISHED_JOB_STATUSES:
+                still_active.append(entry)
+                continue
 
-        for job_id, job in list(self._jobs.items()):
-            age = now - job.created_at
+            del self._jobs[job_id]
+            self._generated_videos.pop(job_id, None)
+            removed += 1
+
+        for entry in still_active:
+            heapq.heappush(self._expiry_heap, entry)
+        return removed
 
-            # 处理超时的进行中任务
-            if job.status in {JobStatus.PENDING, JobStatus.PROCESSING} and age > Config.PROCESSING_JOB_MAX_SECONDS:
-                job.status = JobStatus.FAILED
-                job.error_message = "任务超时"
-                job.progress = min(job.progress, 99)
+    def _cleanup_expired(self, force: bool = False) -> None:
+        """
+        清理过期任务与缓存视频，避免内存占用持续增长
 
-            # 清理完成或失败的历史任务
-            if job.status in {JobStatus.COMPLETED, JobStatus.FAILED} and age > job_ttl_seconds:
+        距上次清理不足 Config.JOB_CLEANUP_INTERVAL_SECONDS 时直接返回。
+
+        Args:
+            force: 是否忽略间隔限制立即清理
+        """
+        now = time.time()
+        if not force and now - self._last_cleanup < Config.JOB_CLEANUP_INTERVAL_SECONDS:
+            return
+        self._last_cleanup = now
+
+        self._drain_expired(Config.JOB_TTL_HOURS * 3600, finished_only=True)
+
+        # 任务数超出上限时按创建顺序淘汰已结束的任务，进行中的任务不受影响
+        excess = len(self._jobs) - Config.MAX_JOBS
+        if excess > 0:
+            finished = [
+                job_id for job_id, job in self._jobs.items()
+                if job.status in FINISHED_JOB_STATUSES
+            ]
+            for job_id in finished[:excess]:
                 del self._jobs[job_id]
                 self._generated_videos.pop(job_id, None)
 
+    @staticmethod
+    def _build_cache_key(
+        prompt: str,
+        mode: str,
+        aspect_ratio: str,
+        resolution: str,
+        duration_seconds: str,
+        first_frame: Optional[str],
+        last_frame: Optional[str]
+    ) -> str:
+        """
+        计算视频生成请求的缓存键
+
+        帧图像以 base64 原文的摘要参与计算，无需在请求路径上解码图片；
+        带帧图像时为 CPU 密集计算，由调用方放到线程池执行。
+
+        Returns:
+            str: 请求参数的 SHA-256 摘要
+        """
+        def frame_digest(frame: Optional[str]) -> Optional[str]:
+            if not frame:
+                return None
+            return hashlib.sha256(frame.encode()).hexdigest()
+
+        payload = {
+            "p": prompt,
+            "m": mode,
+            "a": aspect_ratio,
+            "r": resolution,
+            "d": duration_seconds,
+            "ff": frame_digest(first_frame),
+            "lf": frame_digest(last_frame),
+        }
+        return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+    def _get_cached_result(self, cache_key: str) -> Optional[Tuple[str, Any]]:
+        """
+        查找已完成的相同请求结果
+
+        缓存的视频文件已被删除，或条目超过任务保留时间 (服务端视频引用可能已失效，
+        无法再用于延长) 时视为未命中并移除该条目。
+
+        Args:
+            cache_key: 请求缓存键
+
+        Returns:
+            Optional[Tuple[str, Any]]: (文件名, 视频对象)，未命中返回 None
+        """
+        cached = self._result_cache.get(cache_key)
+        if cached is None:
+            return None
+        filename, video, stored_at = cached
+        if (
+            time.time() - stored_at > Config.JOB_TTL_HOURS * 3600
+            or not (Config.VIDEOS_DIR / filename).is_file()
+        ):
+            del self._result_cache[cache_key]
+            return None
+        self._result_cache.move_to_end(cache_key)
+        return filename, video
+
+    def _store_cached_result(self, cache_key: str, filename: str, video: Any) -> None:
+        """
+        记录已完成的生成结果，超出 Config.VIDEO_CACHE_MAX 时淘汰最久未用的条目
+
+        Args:
+            cache_key: 请求缓存键
+            filename: 视频文件名
+            video: 视频对象 (用于延长)
+        """
+        if Config.VIDEO_CACHE_MAX <= 0:
+            return
+        self._result_cache[cache_key] = (filename, video, time.time())
+        self._result_cache.move_to_end(cache_key)
+        while len(self._result_cache) > Config.VIDEO_CACHE_MAX:
+            self._result_cache.popitem(last=False)
+
+    async def _add_history_record(
+        self,
+        job_id: str,
+        prompt: str,
+        filename: str,
+        mode: str,
+        aspect_ratio: str,
+        resolution: str
+    ) -> None:
+        """
+        保存视频生成的历史记录，失败时仅记录警告
+
+        Args:
+            job_id: 任务 ID
+            prompt: 视频描述
+            filename: 视频文件名
+            mode: 生成模式
+            aspect_ratio: 宽高比
+            resolution: 分辨率
+        """
+        try:
+            await history_service.add_record(
+                record_type="video",
+                prompt=prompt,
+                filename=filename,
+                params={
+                    "mode": mode,
+                    "aspect_ratio": aspect_ratio,
+                    "resolution": resolution,
+                    "job_id": job_id,
+                }
+            )
+        except Exception as history_error:
+            logger.warning(f"保存视频历史记录失败: {history_error}")
+
     async def generate_video(
         self,
         prompt: str,
@@ -178,10 +570,50 @@ class VideoService:
             aspect_ratio=aspect_ratio,
             resolution=resolution
         )
-        self._jobs[job_id] = job
+        self._add_job(job)
+
+        # 结果缓存与相同请求合并同属 Config.VIDEO_CACHE_MAX > 0 的显式开启项，
+        # 关闭时每个请求都独立生成，也无需计算请求摘要
+        cache_key: Optional[str] = None
+        if Config.VIDEO_CACHE_MAX > 0:
+            # 帧图像可能达数 MB，摘要计算放到线程池，避免阻塞事件循环
+            if first_frame or last_frame:
+                cache_key = await self._run_blocking(
+                    self._build_cache_key,
+                    prompt, mode, aspect_ratio, resolution, duration_seconds, first_frame, last_frame
+                )
+            else:
+                cache_key = self._build_cache_key(
+                    prompt, mode, aspect_ratio, resolution, duration_seconds, None, None
+                )
+
+            # 相同请求已有生成结果时直接复用，省去整次 API 调用与下载
+            cached = self._get_cached_result(cache_key)
+            if cached is not None:
+                filename, video = cached
+                self._generated_videos[job_id] = video
+                job.status = JobStatus.COMPLETED
+                job.progress = 100
+                job.video_filename = filename
+                logger.info(f"命中视频生成缓存: job_id={job_id}, filename={filename}")
+                # 复用的结果同样写入历史记录，新任务才会出现在历史列表中
+                self._spawn(
+                    job_id,
+                    self._add_history_record(job_id, prompt, filename, mode, aspect_ratio, resolution)
+                )
+                return job_id
+
+            # 相同请求正在生成时等待其结果，不再重复调用 API
+            inflight = self._inflight.get(cache_key)
+            if inflight is not None:
+                logger.info(f"复用进行中的视频生成: job_id={job_id}")
+                self._spawn(job_id, self._follow_inflight(job, inflight))
+                return job_id
+            self._inflight[cache_key] = asyncio.get_running_loop().create_future()
 
         # 在后台启动生成任务
-        asyncio.create_task(
+        self._spawn(
+            job_id,
             self._process_video_generation(
                 job_id=job_id,
                 prompt=prompt,
@@ -190,12 +622,110 @@ class VideoService:
                 resolution=resolution,
                 duration_seconds=duration_seconds,
                 first_frame=first_frame,
-                last_frame=last_frame
+                last_frame=last_frame,
+                cache_key=cache_key
             )
         )
 
         return job_id
 
+    async def _wait_for_operation(
+        self,
+        client: genai.Client,
+        operation: Any,
+        job: VideoJob,
+        start_time: float,
+        timeout_message: str
+    ) -> Any:
+        """
+        轮询视频生成操作直至完成
+
+        轮询间隔按指数退避递增，快速完成的任务能尽早被发现，
+        长任务则减少无效的状态查询。进度按已耗时推进 (30-90%)，与轮询间隔无关。
+
+        Args:
+            client: Gemini 客户端
+            operation: 视频生成操作对象
+            job: 对应的任务对象
+            start_time: 任务开始时间 (time.monotonic)
+            timeout_message: 超过最大轮询时间时的错误消息
+
+        Returns:
+            Any: 已完成的操作对象
+
+        Raises:
+            TimeoutError: 超过 Config.GENAI_VIDEO_POLL_TIMEOUT_SECONDS 仍未完成时
+        """
+        delay = POLL_INITIAL_DELAY_SECONDS
+        while not operation.done:
+            # 超过最大轮询时间则中止，避免永远挂起
+            elapsed = time.monotonic() - start_time
+            if elapsed > Config.GENAI_VIDEO_POLL_TIMEOUT_SECONDS:
+                raise TimeoutError(timeout_message)
+
+            # 更新进度 (30-90%)，约每 10 秒推进 5%
+            job.progress = min(30 + int(elapsed / 2), 90)
+            logger.debug(f"视频生成中... 进度: {job.progress}%")
+
+            await asyncio.sleep(delay * random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER))
+            delay = min(POLL_MAX_DELAY_SECONDS, delay * POLL_BACKOFF)
+
+            # 轮询操作状态，添加重试机制应对网络波动（如 SSL 错误）
+            async with RetryContext(max_retries=3, delay=2.0, backoff=2.0, jitter=0.2) as ctx:
+                while ctx.should_retry():
+                    try:
+                        operation = await asyncio.wait_for(
+                            self._run_blocking(client.operations.get, operation),
+                            timeout=Config.GENAI_VIDEO_API_TIMEOUT_SECONDS
+                        )
+                        break
+                    except Exception as e:
+                        await ctx.handle_error(e)
+
+        return operation
+
+    @staticmethod
+    def _download_to_file(client: genai.Client, video: Any, file_path: str) -> None:
+        """
+        下载视频并直接写入目标文件 (阻塞调用，在线程中执行)
+
+        SDK 不支持流式下载，返回的字节同时挂在 video.video_bytes 上，
+        直接写出这份数据即可，无需再经 video.save 额外一次线程调度。
+
+        Args:
+            client: Gemini 客户端
+            video: 生成的视频对象
+            file_path: 保存路径
+        """
+        data = client.files.download(file=video)
+        with open(file_path, "wb") as f:
+            f.write(data)
+
+    async def _download_video(self, client: genai.Client, video: Any, prefix: str) -> str:
+        """
+        下载生成的视频并保存到视频目录
+
+        Args:
+            client: Gemini 客户端
+            video: 生成的视频对象
+            prefix: 文件名前缀
+
+        Returns:
+            str: 保存的文件名
+        """
+        filename = generate_filename(prefix, "mp4")
+        file_path = str(Config.VIDEOS_DIR / filename)
+        # 下载与写盘在同一线程内完成，添加重试机制应对网络波动（如 SSL 错误）
+        async with self._download_semaphore:
+            async with RetryContext(max_retries=3, delay=2.0, backoff=2.0, jitter=0.2) as ctx:
+                while ctx.should_retry():
+                    try:
+                        await self._run_blocking(self._download_to_file, client, video, file_path)
+                        break
+                    except Exception as e:
+                        await ctx.handle_error(e)
+        return filename
+
     async def _process_video_generation(
         self,
         job_id: str,
@@ -205,7 +735,8 @@ class VideoService:
         resolution: str,
         duration_seconds: str,
         first_frame: Optional[str],
-        last_frame: Optional[str]
+        last_frame: Optional[str],
+        cache_key: Optional[str] = None
     ) -> None:
         """
         处理视频生成任务 (后台运行)
@@ -219,6 +750,7 @@ class VideoService:
             duration_seconds: 视频秒数 ("4"/"6"/"8")
             first_frame: 首帧图像
             last_frame: 尾帧图像
+            cache_key: 请求缓存键，成功后写入结果缓存并通知等待中的相同请求
         """
         job = self._jobs[job_id]
         job.status = JobStatus.PROCESSING
@@ -229,34 +761,24 @@ class VideoService:
             start_time = time.monotonic()
 
             # 构建配置（包含秒数参数）
-            config = types.GenerateVideosConfig(
-                aspect_ratio=aspect_ratio,
-                resolution=resolution,
-                duration_seconds=duration_seconds
-            )
+            config = _generation_config(aspect_ratio, resolution, duration_seconds)
 
             # 准备图像参数
             image = None
             if mode == "img2vid" and first_frame:
                 # 图生视频模式
                 # 解码图像字节并规范化为 PNG
-                image_bytes, mime_type = await asyncio.to_thread(
-                    decode_base64_to_image_bytes, first_frame
-                )
+                image_bytes, mime_type = await self._decode_frame(first_frame)
                 image = types.Image(imageBytes=image_bytes, mimeType=mime_type)
                 logger.debug(f"使用首帧图像生成视频: mime={mime_type}, bytes={len(image_bytes)}")
 
             elif mode == "first_last" and first_frame:
                 # 首尾帧插值模式
-                first_bytes, first_mime = await asyncio.to_thread(
-                    decode_base64_to_image_bytes, first_frame
-                )
+                first_bytes, first_mime = await self._decode_frame(first_frame)
                 image = types.Image(imageBytes=first_bytes, mimeType=first_mime)
 
                 if last_frame:
-                    last_bytes, last_mime = await asyncio.to_thread(
-                        decode_base64_to_image_bytes, last_frame
-                    )
+                    last_bytes, last_mime = await self._decode_frame(last_frame)
 
                     config = types.GenerateVideosConfig(
                         aspect_ratio=aspect_ratio,
@@ -278,7 +800,7 @@ class VideoService:
                 client = self._ensure_client()
                 # 生成视频为阻塞调用，使用线程池并设置超时
                 operation = await asyncio.wait_for(
-                    asyncio.to_thread(
+                    self._run_blocking(
                         client.models.generate_videos,
                         model=Config.VIDEO_MODEL,
                         prompt=prompt,
@@ -296,29 +818,9 @@ class VideoService:
             job.progress = 30
 
             # 轮询等待视频生成完成
-            poll_count = 0
-            while not operation.done:
-                # 超过最大轮询时间则中止，避免永远挂起
-                if time.monotonic() - start_time > Config.GENAI_VIDEO_POLL_TIMEOUT_SECONDS:
-                    raise TimeoutError("视频生成超时")
-
-                poll_count += 1
-                # 更新进度 (30-90%)
-                job.progress = min(30 + poll_count * 5, 90)
-                logger.debug(f"视频生成中... 进度: {job.progress}%")
-
-                await asyncio.sleep(10)
-                # 轮询操作状态，添加重试机制应对网络波动（如 SSL 错误）
-                async with RetryContext(max_retries=3, delay=2.0, backoff=2.0) as ctx:
-                    while ctx.should_retry():
-                        try:
-                            operation = await asyncio.wait_for(
-                                asyncio.to_thread(client.operations.get, operation),
-                                timeout=Config.GENAI_VIDEO_API_TIMEOUT_SECONDS
-                            )
-                            break
-                        except Exception as e:
-                            await ctx.handle_error(e)
+            operation = await self._wait_for_operation(
+                client, operation, job, start_time, "视频生成超时"
+            )
 
             job.progress = 95
 
@@ -340,23 +842,14 @@ class VideoService:
 
             # 下载并保存视频
             generated_video = operation.response.generated_videos[0]
-            # 下载视频文件，添加重试机制应对网络波动（如 SSL 错误）
-            async with RetryContext(max_retries=3, delay=2.0, backoff=2.0) as ctx:
-                while ctx.should_retry():
-                    try:
-                        await asyncio.to_thread(client.files.download, file=generated_video.video)
-                        break
-                    except Exception as e:
-                        await ctx.handle_error(e)
-
-            # 保存视频文件
-            filename = generate_filename("video", "mp4")
-            file_path = Config.VIDEOS_DIR / filename
-            # 文件保存为阻塞 IO，放线程执行
-            await asyncio.to_thread(generated_video.video.save, str(file_path))
+            filename = await self._download_video(client, generated_video.video, "video")
 
-            # 存储视频对象 (用于后续延长)
-            self._generated_videos[job_id] = generated_video.video
+            # 存储视频引用 (用于后续延长)
+            video_ref = _video_reference(generated_video.video)
+            self._generated_videos[job_id] = video_ref
+            if cache_key:
+                self._store_cached_result(cache_key, filename, video_ref)
+            self._settle_inflight(cache_key, result=(filename, video_ref))
 
             # 更新任务状态
             job.status = JobStatus.COMPLETED
@@ -366,25 +859,16 @@ class VideoService:
             logger.info(f"视频生成完成: {filename}")
 
             # 保存历史记录 (生成完成后一次性写入)
-            try:
-                await history_service.add_record(
-                    record_type="video",
-                    prompt=prompt,
-                    filename=filename,
-                    params={
-                        "mode": mode,
-                        "aspect_ratio": aspect_ratio,
-                        "resolution": resolution,
-                        "job_id": job_id,
-                    }
-                )
-            except Exception as history_error:
-                logger.warning(f"保存视频历史记录失败: {history_error}")
+            await self._add_history_record(job_id, prompt, filename, mode, aspect_ratio, resolution)
 
         except Exception as e:
             logger.error(f"视频生成失败: {e}")
             job.status = JobStatus.FAILED
             job.error_message = str(e)
+            self._settle_inflight(cache_key, error=e)
+        finally:
+            # 任务被取消等未捕获情况下同样释放等待者 (已结束时为空操作)
+            self._settle_inflight(cache_key, error=RuntimeError("视频生成已中止"))
 
     async def extend_video(
         self,
@@ -432,10 +916,11 @@ class VideoService:
             aspect_ratio=aspect_ratio,  # 使用传入的宽高比
             resolution="720p"
         )
-        self._jobs[job_id] = job
+        self._add_job(job)
 
         # 在后台启动延长任务
-        asyncio.create_task(
+        self._spawn(
+            job_id,
             self._process_video_extension(job_id, original_video, prompt, aspect_ratio)
         )
 
@@ -468,16 +953,12 @@ class VideoService:
             # 调用 API 延长视频
             client = self._ensure_client()
             operation = await asyncio.wait_for(
-                asyncio.to_thread(
+                self._run_blocking(
                     client.models.generate_videos,
                     model=Config.VIDEO_MODEL,
                     video=original_video,
                     prompt=prompt,
-                    config=types.GenerateVideosConfig(
-                        number_of_videos=1,
-                        resolution="720p",
-                        aspect_ratio=aspect_ratio
-                    )
+                    config=_extension_config(aspect_ratio)
                 ),
                 timeout=Config.GENAI_VIDEO_API_TIMEOUT_SECONDS
             )
@@ -485,25 +966,9 @@ class VideoService:
             job.progress = 30
 
             # 轮询等待完成
-            poll_count = 0
-            while not operation.done:
-                if time.monotonic() - start_time > Config.GENAI_VIDEO_POLL_TIMEOUT_SECONDS:
-                    raise TimeoutError("视频延长超时")
-
-                poll_count += 1
-                job.progress = min(30 + poll_count * 5, 90)
-                await asyncio.sleep(10)
-                # 轮询操作状态，添加重试机制应对网络波动（如 SSL 错误）
-                async with RetryContext(max_retries=3, delay=2.0, backoff=2.0) as ctx:
-                    while ctx.should_retry():
-                        try:
-                            operation = await asyncio.wait_for(
-                                asyncio.to_thread(client.operations.get, operation),
-                                timeout=Config.GENAI_VIDEO_API_TIMEOUT_SECONDS
-                            )
-                            break
-                        except Exception as e:
-                            await ctx.handle_error(e)
+            operation = await self._wait_for_operation(
+                client, operation, job, start_time, "视频延长超时"
+            )
 
             job.progress = 95
 
@@ -525,21 +990,10 @@ class VideoService:
 
             # 下载并保存视频
             generated_video = operation.response.generated_videos[0]
-            # 下载视频文件，添加重试机制应对网络波动（如 SSL 错误）
-            async with RetryContext(max_retries=3, delay=2.0, backoff=2.0) as ctx:
-                while ctx.should_retry():
-                    try:
-                        await asyncio.to_thread(client.files.download, file=generated_video.video)
-                        break
-                    except Exception as e:
-                        await ctx.handle_error(e)
-
-            filename = generate_filename("video_extended", "mp4")
-            file_path = Config.VIDEOS_DIR / filename
-            await asyncio.to_thread(generated_video.video.save, str(file_path))
+            filename = await self._download_video(client, generated_video.video, "video_extended")
 
-            # 存储新视频对象
-            self._generated_videos[job_id] = generated_video.video
+            # 存储新视频引用
+            self._generated_videos[job_id] = _video_reference(generated_video.video)
 
             job.status = JobStatus.COMPLETED
             job.progress = 100
@@ -580,7 +1034,11 @@ class VideoService:
         """
         # 查询前清理过期任务
         self._cleanup_expired()
-        return self._jobs.get(job_id)
+        job = self._jobs.get(job_id)
+        if job is not None:
+            # 超时检查只针对被查询的任务，无需遍历全部任务
+            self._expire_stale_job(job, time.time())
+        return job
 
     def cleanup_old_jobs(self, max_age_hours: int = 24) -> int:
         """
@@ -592,20 +1050,7 @@ class VideoService:
         Returns:
             int: 清理的任务数量
         """
-        current_time = time.time()
-        max_age_seconds = max_age_hours * 3600
-        cleaned = 0
-
-        job_ids_to_remove = []
-        for job_id, job in self._jobs.items():
-            if current_time - job.created_at > max_age_seconds:
-                job_ids_to_remove.append(job_id)
-
-        for job_id in job_ids_to_remove:
-            del self._jobs[job_id]
-            if job_id in self._generated_videos:
-                del self._generated_videos[job_id]
-            cleaned += 1
+        cleaned = self._drain_expired(max_age_hours * 3600, finished_only=False)
 
         if cleaned > 0:
             logger.info(f"清理了 {cleaned} 个过期任务")
@@ -10,11 +10,17 @@ from .file_utils import (
     decode_base64_to_image_bytes,
     read_json_file,
     write_json_file,
+    read_jsonl_file,
+    append_jsonl_file,
+    write_jsonl_file,
     get_file_url,
     safe_resolve_path,
+    b64decode,
+    strip_data_url_prefix,
 )
 from .retry import retry_async, RetryContext
 from .error_utils import raise_internal_error
+from .genai_utils import get_genai_client
 
 __all__ = [
     "generate_filename",
@@ -24,9 +30,15 @@ __all__ = [
     "decode_base64_to_image_bytes",
     "read_json_file",
     "write_json_file",
+    "read_jsonl_file",
+    "append_jsonl_file",
+    "write_jsonl_file",
     "get_file_url",
     "safe_resolve_path",
+    "b64decode",
+    "strip_data_url_prefix",
     "retry_async",
     "RetryContext",
     "raise_internal_error",
+    "get_genai_client",
 ]
@@ -8,23 +8,83 @@
 """
 
 import os
-import base64
-import json
 import asyncio
-import aiofiles
-from datetime import datetime
+import threading
+import time
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Any, Iterable
+from typing import Callable, Optional, Any, Iterable, List, Tuple
 from PIL import Image
 import io
+from functools import lru_cache
 
 from ..config import Config, logger
 
+try:
+    # pybase64 使用 SIMD 指令解码，大尺寸 data URL 的解码耗时显著降低
+    from pybase64 import b64decode
+except ImportError:  # 未安装时回退到标准库，接口一致
+    from base64 import b64decode
+
+
+# 文件读写专用线程池，与默认线程池隔离，避免保存/读取排在其他阻塞调用之后
+_IO_POOL = ThreadPoolExecutor(
+    max_workers=max(1, Config.FILE_IO_WORKERS),
+    thread_name_prefix="file-io"
+)
+
+
+async def _run_io(func: Callable[..., Any], *args: Any) -> Any:
+    """
+    在文件读写专用线程池中执行阻塞调用
+
+    Args:
+        func: 阻塞函数
+        *args: 位置参数
+
+    Returns:
+        Any: 函数返回值
+    """
+    return await asyncio.get_running_loop().run_in_executor(_IO_POOL, func, *args)
+
+
+# data URL 头部 (如 "data:image/png;base64,") 的最大查找长度
+_DATA_URL_HEADER_MAX = 256
+
+
+def strip_data_url_prefix(base64_data: str) -> str:
+    """
+    移除 base64 数据可能携带的 data URL 前缀
+
+    只在头部范围内查找逗号，不扫描整段 (可能数 MB 的) 数据；前缀前的空白字符会被忽略。
+
+    Args:
+        base64_data: base64 编码的数据 (可包含 data URL 前缀)
+
+    Returns:
+        str: 去除前缀后的 base64 数据
+    """
+    stripped = base64_data.lstrip()
+    if not stripped.startswith("data:"):
+        return base64_data
+    comma = stripped.find(",", 5, _DATA_URL_HEADER_MAX)
+    return stripped[comma + 1:] if comma > 0 else base64_data
+
+
+# 上一次生成文件名所用的微秒时间戳，保证同一微秒内批量生成的文件名不重复
+_last_filename_us = 0
+# 按秒缓存的日期时间部分 (秒数, "YYYYmmdd_HHMMSS")，同一秒内无需重复格式化
+_filename_second: Tuple[int, str] = (-1, "")
+_filename_lock = threading.Lock()
+
 
 def generate_filename(prefix: str, extension: str) -> str:
     """
     生成带时间戳的文件名
 
+    时间戳精确到微秒且单调递增，同一批次内连续生成的文件名不会重复。
+
     Args:
         prefix: 文件名前缀，如 "image" 或 "video"
         extension: 文件扩展名，如 "png" 或 "mp4"
@@ -36,8 +96,48 @@ def generate_filename(prefix: str, extension: str) -> str:
         >>> generate_filename("image", "png")
         "image_20240115_143052_123456.png"
     """
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-    return f"{prefix}_{timestamp}.{extension}"
+    global _last_filename_us, _filename_second
+    with _filename_lock:
+        # 与上一次相同 (同一微秒内连续调用) 时顺延 1 微秒，避免文件互相覆盖
+        now_us = max(time.time_ns() // 1000, _last_filename_us + 1)
+        _last_filename_us = now_us
+
+        seconds, micros = divmod(now_us, 1_000_000)
+        if _filename_second[0] != seconds:
+            _filename_second = (seconds, time.strftime("%Y%m%d_%H%M%S", time.localtime(seconds)))
+        date_part = _filename_second[1]
+
+    return f"{prefix}_{date_part}_{micros:06d}.{extension}"
+
+
+# 分块解码 base64 时每块的字符数 (4 的倍数，保证每块独立可解码)
+_BASE64_CHUNK_CHARS = 4 * 1024 * 1024
+# base64 数据中可能出现的换行/空白字符 (按行折叠的数据)，分块前需移除
+_BASE64_WHITESPACE = (" ", "\n", "\r", "\t")
+
+
+def _write_base64_file(file_path: Path, base64_data: str) -> None:
+    """
+    分块解码 base64 数据并写入文件 (阻塞调用，在线程中执行)
+
+    每次只持有一块解码结果，避免为整段数据额外分配一份完整的字节对象。
+    数据中夹杂换行等空白字符时先移除，保证每块按 4 字符对齐；
+    解码失败时删除未写完的文件。
+
+    Args:
+        file_path: 保存路径
+        base64_data: 不含 data URL 前缀的 base64 数据
+    """
+    if any(ch in base64_data for ch in _BASE64_WHITESPACE):
+        base64_data = "".join(base64_data.split())
+    try:
+        with open(file_path, "wb") as f:
+            for start in range(0, len(base64_data), _BASE64_CHUNK_CHARS):
+                f.write(b64decode(base64_data[start:start + _BASE64_CHUNK_CHARS]))
+    except Exception:
+        # 解码失败时删除写了一半的文件
+        file_path.unlink(missing_ok=True)
+        raise
 
 
 async def save_image_from_base64(
@@ -61,11 +161,7 @@ async def save_image_from_base64(
     """
     try:
         # 移除可能的 data URL 前缀
-        if "," in base64_data:
-            base64_data = base64_data.split(",")[1]
-
-        # 解码 base64 数据
-        image_data = base64.b64decode(base64_data)
+        base64_data = strip_data_url_prefix(base64_data)
 
         # 生成文件名
         if filename is None:
@@ -74,16 +170,15 @@ async def save_image_from_base64(
         # 确保目录存在
         directory.mkdir(parents=True, exist_ok=True)
 
-        # 保存文件
+        # 分块解码并写入文件 (CPU 密集操作，放线程执行避免阻塞事件循环)
         file_path = directory / filename
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(image_data)
+        await _run_io(_write_base64_file, file_path, base64_data)
 
-        logger.info(f"图像已保存: {filename}")
+        logger.info("图像已保存: %s", filename)
         return filename
 
     except Exception as e:
-        logger.error(f"保存图像失败: {e}")
+        logger.error("保存图像失败: %s", e)
         raise ValueError(f"无法保存图像: {e}")
 
 
@@ -113,14 +208,13 @@ async def save_video_from_bytes(
 
         # 保存文件
         file_path = directory / filename
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(video_bytes)
+        await _run_io(file_path.write_bytes, video_bytes)
 
-        logger.info(f"视频已保存: {filename}")
+        logger.info("视频已保存: %s", filename)
         return filename
 
     except Exception as e:
-        logger.error(f"保存视频失败: {e}")
+        logger.error("保存视频失败: %s", e)
         raise ValueError(f"无法保存视频: {e}")
 
 
@@ -139,19 +233,22 @@ def decode_base64_image(base64_data: str) -> Image.Image:
     """
     try:
         # 移除可能的 data URL 前缀
-        if "," in base64_data:
-            base64_data = base64_data.split(",")[1]
+        base64_data = strip_data_url_prefix(base64_data)
 
         # 解码并创建 Image 对象
-        image_data = base64.b64decode(base64_data)
+        image_data = b64decode(base64_data)
         image = Image.open(io.BytesIO(image_data))
         return image
 
     except Exception as e:
-        logger.error(f"解码图像失败: {e}")
+        logger.error("解码图像失败: %s", e)
         raise ValueError(f"无法解码图像: {e}")
 
 
+# PNG 文件中 IHDR 块位深字段的偏移 (8 字节签名 + 8 字节块头 + 8 字节宽高)
+_PNG_BIT_DEPTH_OFFSET = 24
+
+
 def decode_base64_to_image_bytes(base64_data: str) -> tuple[bytes, str]:
     """
     将 base64 编码的图像解码为二进制字节，并规范化为 PNG
@@ -166,31 +263,56 @@ def decode_base64_to_image_bytes(base64_data: str) -> tuple[bytes, str]:
         ValueError: 如果解码失败
     """
     try:
-        # 解析 data URL 头部
-        mime_type = "image/png"
-        if "," in base64_data and base64_data.strip().startswith("data:"):
-            header, base64_data = base64_data.split(",", 1)
-            # header 格式: data:image/png;base64
-            if ";" in header:
-                mime_type = header[5:].split(";")[0] or mime_type
+        # 移除可能的 data URL 前缀 (输出统一规范化为 PNG，无需解析头部的 mime 类型)
+        base64_data = strip_data_url_prefix(base64_data)
 
         # 解码 base64 为原始字节
-        raw_bytes = base64.b64decode(base64_data)
+        raw_bytes = b64decode(base64_data)
 
         # 使用 PIL 规范化为 PNG，避免 RGB/Alpha 兼容问题
         image = Image.open(io.BytesIO(raw_bytes))
+
+        # 已是 8 位无透明色的 RGB PNG 时无需解码像素再重新编码，校验数据块完整后直接使用原始字节；
+        # 16 位或带 tRNS 透明色块的 PNG 仍走下方的规范化流程
+        if (
+            image.format == "PNG"
+            and image.mode == "RGB"
+            and raw_bytes[_PNG_BIT_DEPTH_OFFSET] == 8
+            and "transparency" not in image.info
+        ):
+            image.verify()
+            return raw_bytes, "image/png"
+
         if image.mode != "RGB":
             image = image.convert("RGB")
 
+        # 仅作为 API 输入，使用低压缩级别换取更快的编码
         buffer = io.BytesIO()
-        image.save(buffer, format="PNG")
+        image.save(buffer, format="PNG", compress_level=1)
         return buffer.getvalue(), "image/png"
 
     except Exception as e:
-        logger.error(f"解码图像字节失败: {e}")
+        logger.error("解码图像字节失败: %s", e)
         raise ValueError(f"无法解码图像: {e}")
 
 
+@lru_cache(maxsize=16)
+def _resolve_base_dir(base_dir: Path) -> Path:
+    """
+    解析基础目录的真实路径 (结果按目录缓存)
+
+    基础目录均来自 Config 中的固定配置，进程内不会变化，
+    缓存后每次文件请求无需重复执行 realpath。
+
+    Args:
+        base_dir: 基础目录
+
+    Returns:
+        Path: 解析后的绝对路径
+    """
+    return base_dir.resolve()
+
+
 def safe_resolve_path(
     base_dir: Path,
     filename: str,
@@ -202,7 +324,8 @@ def safe_resolve_path(
     Args:
         base_dir: 允许访问的基础目录
         filename: 用户提供的文件名
-        allowed_extensions: 允许的扩展名集合 (如 [".png", ".mp4"])，None 表示不限制
+        allowed_extensions: 允许的扩展名集合 (如 [".png", ".mp4"])，None 表示不限制；
+            传入 frozenset 时视为已是小写扩展名，直接使用而不再逐次构建集合
 
     Returns:
         Path: 解析后的安全路径
@@ -211,14 +334,14 @@ def safe_resolve_path(
         ValueError: 如果文件名非法或越权访问
     """
     # 基础目录必须存在，避免解析到非预期位置
-    base_dir_resolved = base_dir.resolve()
+    base_dir_resolved = _resolve_base_dir(base_dir)
 
     # 拒绝空值、当前/上级目录等高风险输入
     if not filename or filename in {".", ".."}:
         raise ValueError("非法文件名")
 
-    # 拒绝包含路径分隔符的输入，强制仅允许纯文件名
-    if "/" in filename or "\\" in filename:
+    # 拒绝包含路径分隔符或空字符的输入，强制仅允许纯文件名
+    if "/" in filename or "\\" in filename or "\x00" in filename:
         raise ValueError("非法文件名")
 
     # 拒绝路径片段，确保只保留文件名
@@ -228,18 +351,58 @@ def safe_resolve_path(
     # 扩展名白名单校验，防止任意类型读取
     if allowed_extensions is not None:
         suffix = Path(filename).suffix.lower()
-        allowed = {ext.lower() for ext in allowed_extensions}
+        if isinstance(allowed_extensions, frozenset):
+            allowed = allowed_extensions
+        else:
+            allowed = {ext.lower() for ext in allowed_extensions}
         if suffix not in allowed:
             raise ValueError("不允许的文件类型")
 
-    # 解析最终路径并验证在基础目录内
-    file_path = (base_dir_resolved / filename).resolve()
-    if not file_path.is_relative_to(base_dir_resolved):
+    # 以上校验保证文件名是基础目录下的单级纯文件名，拼接结果不会越出基础目录；
+    # 唯一的越权途径是指向目录外的符号链接，用一次 lstat 拒绝即可，无需逐级 realpath
+    file_path = base_dir_resolved / filename
+    try:
+        is_symlink = file_path.is_symlink()
+    except OSError:
+        # 文件名过长等无法 lstat 的路径不可能是已存在的文件，交由调用方按不存在处理
+        is_symlink = False
+    if is_symlink:
         raise ValueError("非法路径访问")
 
     return file_path
 
 
+def _replace_file_bytes(file_path: Path, content: bytes) -> None:
+    """
+    先写临时文件再原子替换目标文件 (阻塞调用，在线程中执行)
+
+    写入与替换在同一次线程调度内完成；中途失败时原文件保持不变。
+    替换前先将临时文件刷到磁盘，避免系统崩溃后出现替换成功但内容为空的文件。
+
+    Args:
+        file_path: 目标文件路径
+        content: 文件内容
+    """
+    temp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+    with open(temp_path, "wb") as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+
+
+def _append_file_bytes(file_path: Path, content: bytes) -> None:
+    """
+    向文件末尾追加字节 (阻塞调用，在线程中执行)
+
+    Args:
+        file_path: 文件路径
+        content: 追加的内容
+    """
+    with open(file_path, "ab") as f:
+        f.write(content)
+
+
 async def read_json_file(file_path: Path) -> Any:
     """
     异步读取 JSON 文件
@@ -252,14 +415,14 @@ async def read_json_file(file_path: Path) -> Any:
 
     Raises:
         FileNotFoundError: 如果文件不存在
-        json.JSONDecodeError: 如果 JSON 格式无效
+        orjson.JSONDecodeError: 如果 JSON 格式无效
     """
     if not file_path.exists():
         return None
 
-    async with aiofiles.open(file_path, "r", encoding="utf-8") as f:
-        content = await f.read()
-        return json.loads(content)
+    # 以字节读取并交给 orjson 解析，省去 UTF-8 解码为 str 的中间拷贝
+    content = await _run_io(file_path.read_bytes)
+    return orjson.loads(content)
 
 
 async def write_json_file(file_path: Path, data: Any) -> None:
@@ -273,14 +436,75 @@ async def write_json_file(file_path: Path, data: Any) -> None:
     # 确保目录存在
     file_path.parent.mkdir(parents=True, exist_ok=True)
 
+    # orjson 直接输出 UTF-8 字节，保留两空格缩进便于人工查看
+    content = orjson.dumps(data, default=str, option=orjson.OPT_INDENT_2)
     # 使用临时文件写入，避免并发写导致文件损坏
-    temp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+    await _run_io(_replace_file_bytes, file_path, content)
+
+
+async def read_jsonl_file(file_path: Path) -> Optional[List[Any]]:
+    """
+    异步读取 JSON Lines 文件
+
+    无法解析的行 (如进程在追加途中退出留下的半行) 会被跳过并记录警告。
+
+    Args:
+        file_path: JSONL 文件路径
+
+    Returns:
+        Optional[List[Any]]: 按文件顺序解析后的记录列表，文件不存在则返回 None
+    """
+    if not file_path.exists():
+        return None
+
+    content = await _run_io(file_path.read_bytes)
+
+    records = []
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(orjson.loads(line))
+        except orjson.JSONDecodeError:
+            logger.warning("跳过无法解析的 JSONL 行: %s", file_path)
+    return records
+
+
+async def append_jsonl_file(file_path: Path, records: Iterable[Any]) -> None:
+    """
+    向 JSON Lines 文件末尾追加记录
+
+    Args:
+        file_path: JSONL 文件路径
+        records: 要追加的记录 (按文件顺序)
+    """
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    content = b"".join(orjson.dumps(record, default=str) + b"\n" for record in records)
+
+    # 多条记录合并为一次写入，追加模式下无需重写已有内容
+    await _run_io(_append_file_bytes, file_path, content)
+
+
+async def write_jsonl_file(file_path: Path, records: Iterable[Any]) -> None:
+    """
+    异步重写整个 JSON Lines 文件
+
+    Args:
+        file_path: JSONL 文件路径
+        records: 要写入的记录 (按文件顺序)
+    """
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    content = b"".join(orjson.dumps(record, default=str) + b"\n" for record in records)
+    # 使用临时文件写入，避免并发写导致文件损坏
+    await _run_io(_replace_file_bytes, file_path, content)
 
-    async with aiofiles.open(temp_path, "w", encoding="utf-8") as f:
-        await f.write(json.dumps(data, ensure_ascii=False, indent=2, default=str))
 
-    # 原子替换，保证写入过程可恢复
-    await asyncio.to_thread(os.replace, temp_path, file_path)
+# 各文件类型对应的访问路径前缀
+_FILE_URL_PREFIXES = {
+    "image": "/api/image/",
+    "video": "/api/video/",
+}
 
 
 def get_file_url(filename: str, file_type: str) -> str:
@@ -294,9 +518,7 @@ def get_file_url(filename: str, file_type: str) -> str:
     Returns:
         str: 文件的 URL 路径
     """
-    if file_type == "image":
-        return f"/api/image/{filename}"
-    elif file_type == "video":
-        return f"/api/video/{filename}"
-    else:
+    prefix = _FILE_URL_PREFIXES.get(file_type)
+    if prefix is None:
         raise ValueError(f"未知的文件类型: {file_type}")
+    return prefix + filename
@@ -0,0 +1,34 @@
+"""
+Gemini 客户端工具模块
+
+提供进程内共享的 Gemini 客户端:
+- 图像、视频、提示词服务复用同一客户端及其连接池
+- 首次使用时才创建，避免配置缺失导致应用启动失败
+"""
+
+from functools import lru_cache
+
+from google import genai
+
+from ..config import Config, logger
+
+
+@lru_cache(maxsize=1)
+def get_genai_client() -> genai.Client:
+    """
+    获取共享的 Gemini 客户端 (首次调用时创建)
+
+    各服务共用一个客户端，复用同一组 HTTP 连接与 TLS 会话。
+    API Key 缺失时抛出的异常不会被缓存，配置补全后可再次创建。
+
+    Returns:
+        genai.Client: 可用的 Gemini 客户端
+
+    Raises:
+        ValueError: 当 API Key 未配置时
+    """
+    if not Config.GOOGLE_CLOUD_API_KEY:
+        raise ValueError("GOOGLE_CLOUD_API_KEY 未设置")
+    client = genai.Client(api_key=Config.GOOGLE_CLOUD_API_KEY)
+    logger.info("Gemini 客户端已初始化")
+    return client
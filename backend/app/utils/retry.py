@@ -5,8 +5,9 @@
 """
 
 import asyncio
+import random
 from functools import wraps
-from typing import Callable, TypeVar, Any
+from typing import Callable, TypeVar, Any, Optional
 from ..config import logger
 
 T = TypeVar("T")
@@ -16,7 +17,10 @@ def retry_async(
     max_retries: int = 3,
     delay: float = 1.0,
     backoff: float = 2.0,
-    exceptions: tuple = (Exception,)
+    exceptions: tuple = (Exception,),
+    jitter: float = 0.0,
+    retry_if: Optional[Callable[[BaseException], bool]] = None,
+    max_delay: float = 30.0
 ) -> Callable:
     """
     异步函数重试装饰器
@@ -28,6 +32,10 @@ def retry_async(
         delay: 初始延迟时间 (秒)
         backoff: 延迟时间的增长倍数
         exceptions: 需要重试的异常类型元组
+        jitter: 随机抖动比例，每次等待额外增加 [0, 延迟 × jitter] 秒，
+            避免并发请求同时失败后在同一时刻集中重试
+        retry_if: 可选的判定函数，返回 False 的异常 (如参数错误) 不再重试而直接抛出
+        max_delay: 单次等待的延迟上限 (秒)，避免指数增长后等待过久
 
     Returns:
         Callable: 装饰器函数
@@ -41,27 +49,35 @@ def retry_async(
     def decorator(func: Callable[..., T]) -> Callable[..., T]:
         @wraps(func)
         async def wrapper(*args: Any, **kwargs: Any) -> T:
+            # 首次调用单独执行：成功是常见情况，无需初始化重试状态
+            try:
+                return await func(*args, **kwargs)
+            except exceptions as e:
+                if retry_if is not None and not retry_if(e):
+                    raise
+                last_exception = e
+
             current_delay = delay
-            last_exception = None
+            for attempt in range(1, max_retries + 1):
+                logger.warning(
+                    f"函数 {func.__name__} 执行失败 (尝试 {attempt}/{max_retries + 1}): {last_exception}"
+                )
+                wait = current_delay + random.uniform(0, current_delay * jitter)
+                logger.info(f"等待 {wait:.1f} 秒后重试...")
+                await asyncio.sleep(wait)
+                current_delay = min(current_delay * backoff, max_delay)
 
-            for attempt in range(max_retries + 1):
                 try:
                     return await func(*args, **kwargs)
                 except exceptions as e:
+                    if retry_if is not None and not retry_if(e):
+                        raise
                     last_exception = e
-                    if attempt < max_retries:
-                        logger.warning(
-                            f"函数 {func.__name__} 执行失败 (尝试 {attempt + 1}/{max_retries + 1}): {e}"
-                        )
-                        logger.info(f"等待 {current_delay:.1f} 秒后重试...")
-                        await asyncio.sleep(current_delay)
-                        current_delay *= backoff
-                    else:
-                        logger.error(
-                            f"函数 {func.__name__} 在 {max_retries + 1} 次尝试后仍然失败"
-                        )
 
             # 如果所有重试都失败，抛出最后一个异常
+            logger.error(
+                f"函数 {func.__name__} 在 {max_retries + 1} 次尝试后仍然失败"
+            )
             raise last_exception
 
         return wrapper
@@ -88,7 +104,9 @@ class RetryContext:
         self,
         max_retries: int = 3,
         delay: float = 1.0,
-        backoff: float = 2.0
+        backoff: float = 2.0,
+        jitter: float = 0.0,
+        max_delay: float = 30.0
     ):
         """
         初始化重试上下文
@@ -97,10 +115,14 @@ class RetryContext:
             max_retries: 最大重试次数
             delay: 初始延迟时间 (秒)
             backoff: 延迟时间的增长倍数
+            jitter: 随机抖动比例，每次等待额外增加 [0, 延迟 × jitter] 秒
+            max_delay: 单次等待的延迟上限 (秒)
         """
         self.max_retries = max_retries
         self.delay = delay
         self.backoff = backoff
+        self.jitter = jitter
+        self.max_delay = max_delay
         self.attempt = 0
         self.current_delay = delay
         self.last_error = None
@@ -140,7 +162,8 @@ class RetryContext:
             raise error
 
         logger.warning(f"操作失败 (尝试 {self.attempt}/{self.max_retries + 1}): {error}")
-        logger.info(f"等待 {self.current_delay:.1f} 秒后重试...")
+        wait = self.current_delay + random.uniform(0, self.current_delay * self.jitter)
+        logger.info(f"等待 {wait:.1f} 秒后重试...")
 
-        await asyncio.sleep(self.current_delay)
-        self.current_delay *= self.backoff
+        await asyncio.sleep(wait)
+        self.current_delay = min(self.current_delay * self.backoff, self.max_delay)
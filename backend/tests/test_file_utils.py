@@ -0,0 +1,129 @@
+"""
+文件工具函数测试
+"""
+
+import base64
+import io
+import os
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from app.utils import (
+    file_utils,
+    decode_base64_to_image_bytes,
+    safe_resolve_path,
+    strip_data_url_prefix,
+)
+
+_IMAGE_EXTENSIONS = frozenset({".png"})
+
+
+def test_safe_resolve_path_returns_path_inside_base_dir(tmp_path):
+    """合法文件名解析到基础目录下"""
+    result = safe_resolve_path(tmp_path, "a.png", _IMAGE_EXTENSIONS)
+
+    assert result == tmp_path.resolve() / "a.png"
+
+
+@pytest.mark.parametrize("filename", ["", ".", "..", "../a.png", "sub/a.png", "sub\\a.png", "a\x00b.png"])
+def test_safe_resolve_path_rejects_illegal_filename(tmp_path, filename):
+    """空值、路径片段、分隔符与空字符均被拒绝"""
+    with pytest.raises(ValueError):
+        safe_resolve_path(tmp_path, filename, _IMAGE_EXTENSIONS)
+
+
+def test_safe_resolve_path_rejects_disallowed_extension(tmp_path):
+    """扩展名不在白名单内时被拒绝"""
+    with pytest.raises(ValueError):
+        safe_resolve_path(tmp_path, "a.txt", _IMAGE_EXTENSIONS)
+
+
+def test_safe_resolve_path_rejects_symlink_escape(tmp_path):
+    """指向基础目录外的符号链接被拒绝"""
+    base_dir = tmp_path / "images"
+    base_dir.mkdir()
+    outside = tmp_path / "secret.png"
+    outside.write_bytes(b"secret")
+    (base_dir / "link.png").symlink_to(outside)
+
+    with pytest.raises(ValueError):
+        safe_resolve_path(base_dir, "link.png", _IMAGE_EXTENSIONS)
+
+
+def test_safe_resolve_path_tolerates_overlong_filename(tmp_path):
+    """文件名过长无法 lstat 时仍返回路径，由调用方按文件不存在处理"""
+    filename = "a" * 300 + ".png"
+
+    assert safe_resolve_path(tmp_path, filename, _IMAGE_EXTENSIONS) == tmp_path.resolve() / filename
+
+
+def test_write_base64_file_accepts_line_wrapped_data(tmp_path, monkeypatch):
+    """按行折叠的 base64 数据分块解码后内容不变"""
+    monkeypatch.setattr(file_utils, "_BASE64_CHUNK_CHARS", 8)
+    data = os.urandom(1000)
+    file_path = tmp_path / "a.png"
+
+    file_utils._write_base64_file(file_path, base64.encodebytes(data).decode())
+
+    assert file_path.read_bytes() == data
+
+
+@pytest.mark.parametrize("value", ["data:image/png;base64,QUJD", "\n  data:image/png;base64,QUJD", "QUJD"])
+def test_strip_data_url_prefix(value):
+    """data URL 前缀 (含前导空白) 被移除，纯 base64 数据保持不变"""
+    assert strip_data_url_prefix(value) == "QUJD"
+
+
+def _png_base64(image) -> str:
+    """将 PIL 图像编码为 PNG base64 字符串"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def test_decode_base64_to_image_bytes_passes_through_plain_rgb_png():
+    """8 位无透明色的 RGB PNG 原样返回"""
+    data = _png_base64(Image.new("RGB", (4, 4), (1, 2, 3)))
+
+    image_bytes, mime_type = decode_base64_to_image_bytes(data)
+
+    assert image_bytes == base64.b64decode(data)
+    assert mime_type == "image/png"
+
+
+def _png_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """构造一个 PNG 数据块"""
+    crc = zlib.crc32(chunk_type + data) & 0xFFFFFFFF
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", crc)
+
+
+def test_decode_base64_to_image_bytes_normalizes_16_bit_rgb_png():
+    """16 位 RGB PNG (PIL 同样以 RGB 模式打开) 被规范化为 8 位"""
+    width = height = 2
+    rows = b"".join(b"\x00" + b"\x12\x34" * 3 * width for _ in range(height))
+    raw_bytes = (
+        b"\x89PNG\r\n\x1a\n"
+        + _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 16, 2, 0, 0, 0))
+        + _png_chunk(b"IDAT", zlib.compress(rows))
+        + _png_chunk(b"IEND", b"")
+    )
+
+    image_bytes, _ = decode_base64_to_image_bytes(base64.b64encode(raw_bytes).decode())
+
+    assert image_bytes[24] == 8
+    assert Image.open(io.BytesIO(image_bytes)).mode == "RGB"
+
+
+def test_decode_base64_to_image_bytes_reencodes_rgb_png_with_transparency():
+    """带 tRNS 透明色块的 RGB PNG 不直接透传"""
+    image = Image.new("RGB", (4, 4), (1, 2, 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", transparency=(1, 2, 3))
+    raw_bytes = buffer.getvalue()
+
+    image_bytes, _ = decode_base64_to_image_bytes(base64.b64encode(raw_bytes).decode())
+
+    assert image_bytes != raw_bytes
@@ -0,0 +1,168 @@
+"""
+历史记录服务测试 (JSONL 追加日志、删除标记与旧版迁移)
+"""
+
+import asyncio
+import importlib
+import json
+
+import orjson
+import pytest
+
+from app.services.history_service import HistoryService, TOMBSTONE_KEY
+
+# 服务包以同名实例覆盖了子模块属性，通过 import_module 取得模块本身
+history_module = importlib.import_module("app.services.history_service")
+
+
+def _make_service(tmp_path) -> HistoryService:
+    """创建读写临时目录的历史记录服务"""
+    service = HistoryService()
+    service._history_file = tmp_path / "history.jsonl"
+    service._legacy_file = tmp_path / "history.json"
+    return service
+
+
+def _read_lines(path) -> list:
+    """读取 JSONL 文件的全部行"""
+    return [orjson.loads(line) for line in path.read_bytes().splitlines() if line]
+
+
+def test_migrates_legacy_history_json(tmp_path):
+    """首次访问时将旧版 history.json 迁移为按时间顺序的 JSONL，旧文件保留"""
+    legacy_items = [
+        {"id": "new", "type": "image", "prompt": "b", "filename": "b.png"},
+        {"id": "old", "type": "video", "prompt": "a", "filename": "a.mp4"},
+    ]
+    (tmp_path / "history.json").write_text(json.dumps({"items": legacy_items}), encoding="utf-8")
+    service = _make_service(tmp_path)
+
+    items, total = asyncio.run(service.get_history())
+
+    assert total == 2
+    assert [item["id"] for item in items] == ["new", "old"]
+    assert [line["id"] for line in _read_lines(tmp_path / "history.jsonl")] == ["old", "new"]
+    assert (tmp_path / "history.json").exists()
+
+
+def test_migration_skipped_when_jsonl_exists(tmp_path):
+    """JSONL 文件已存在时不再读取旧版文件"""
+    (tmp_path / "history.json").write_text(
+        json.dumps({"items": [{"id": "legacy", "type": "image"}]}), encoding="utf-8"
+    )
+    (tmp_path / "history.jsonl").write_bytes(orjson.dumps({"id": "current", "type": "image"}) + b"\n")
+    service = _make_service(tmp_path)
+
+    items, _ = asyncio.run(service.get_history())
+
+    assert [item["id"] for item in items] == ["current"]
+
+
+def test_delete_appends_tombstone_and_replays_on_reload(tmp_path):
+    """删除只追加删除标记，重新加载时回放标记，压缩后标记被清除"""
+    async def scenario():
+        service = _make_service(tmp_path)
+        keep_id = await service.add_record("image", "keep", "keep.png")
+        drop_id = await service.add_record("image", "drop", "drop.png")
+        assert await service.delete_record(drop_id)
+        return keep_id, drop_id
+
+    keep_id, drop_id = asyncio.run(scenario())
+
+    lines = _read_lines(tmp_path / "history.jsonl")
+    assert lines[-1] == {TOMBSTONE_KEY: drop_id}
+    assert drop_id in {line.get("id") for line in lines}
+
+    reloaded = _make_service(tmp_path)
+    items, total = asyncio.run(reloaded.get_history())
+
+    assert total == 1
+    assert items[0]["id"] == keep_id
+    # 进程内首次访问时压缩重写，删除标记与被删除的记录不再出现在文件中
+    assert _read_lines(tmp_path / "history.jsonl") == items
+
+
+def test_log_is_compacted_after_exceeding_slack(tmp_path, monkeypatch):
+    """日志行数超出保留上限加冗余后整体重写，只保留最新的记录"""
+    monkeypatch.setattr(history_module, "MAX_HISTORY_ITEMS", 3)
+    monkeypatch.setattr(history_module, "HISTORY_COMPACT_SLACK", 2)
+
+    async def scenario():
+        service = _make_service(tmp_path)
+        record_ids = [await service.add_record("image", str(i), f"{i}.png") for i in range(6)]
+        items, total = await service.get_history()
+        return record_ids, items, total
+
+    record_ids, items, total = asyncio.run(scenario())
+
+    assert total == 3
+    assert [item["id"] for item in items] == record_ids[:-4:-1]
+    assert len(_read_lines(tmp_path / "history.jsonl")) <= 3 + 2
+
+
+def test_delete_records_ignores_unknown_ids(tmp_path):
+    """批量删除只计算实际存在的记录，全部不存在时不写入文件"""
+    async def scenario():
+        service = _make_service(tmp_path)
+        record_id = await service.add_record("image", "a", "a.png")
+        before = (tmp_path / "history.jsonl").read_bytes()
+        assert await service.delete_records(["missing-1", "missing-2"]) == 0
+        assert (tmp_path / "history.jsonl").read_bytes() == before
+        return await service.delete_records([record_id, "missing", record_id])
+
+    assert asyncio.run(scenario()) == 1
+
+
+@pytest.mark.parametrize("record_type, expected", [(None, 0), ("video", 1)])
+def test_clear_history(tmp_path, record_type, expected):
+    """清空全部或指定类型的记录"""
+    async def scenario():
+        service = _make_service(tmp_path)
+        await service.add_record("image", "a", "a.png")
+        await service.add_record("video", "b", "b.mp4")
+        await service.clear_history(record_type)
+        _, total = await service.get_history(record_type="image")
+        return total
+
+    assert asyncio.run(scenario()) == expected
+
+
+def test_add_record_releases_batch_when_holder_is_cancelled(tmp_path, monkeypatch):
+    """合并写入的持锁者被取消时，批次内其他调用方不会永远等待"""
+    async def scenario():
+        service = _make_service(tmp_path)
+        await service.get_history()
+
+        write_started = asyncio.Event()
+        release_write = asyncio.Event()
+        append_history = service._append_history
+
+        async def slow_append(records):
+            write_started.set()
+            await release_write.wait()
+            await append_history(records)
+
+        monkeypatch.setattr(service, "_append_history", slow_append)
+
+        # first 持锁写入，second/third 排队后由 second 取走批次
+        first = asyncio.create_task(service.add_record("image", "1", "1.png"))
+        await write_started.wait()
+        write_started.clear()
+        second = asyncio.create_task(service.add_record("image", "2", "2.png"))
+        third = asyncio.create_task(service.add_record("image", "3", "3.png"))
+        await asyncio.sleep(0)
+        release_write.set()
+        await first
+        release_write.clear()
+
+        await write_started.wait()
+        second.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await second
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(third, timeout=1)
+
+        assert not service._pending
+        assert not service._lock.locked()
+
+    asyncio.run(scenario())
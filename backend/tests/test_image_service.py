@@ -0,0 +1,147 @@
+"""
+图像服务测试 (长轮询与任务排队上限)
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app.config import Config
+from app.services import ImageQueueFullError
+from app.services.image_service import ImageJob, ImageService, JobStatus
+
+
+@pytest.fixture
+def service():
+    """创建独立的图像服务实例，测试结束后关闭线程池"""
+    image_service = ImageService()
+    yield image_service
+    image_service.close()
+
+
+def _add_job(service: ImageService, status: JobStatus = JobStatus.PROCESSING) -> ImageJob:
+    """登记一个测试任务"""
+    now = time.time()
+    job = ImageJob(job_id="job", status=status, created_at=now, started_at=now)
+    service._jobs[job.job_id] = job
+    return job
+
+
+def test_wait_for_update_returns_immediately_on_revision_change(service):
+    """客户端版本号落后时立即返回"""
+    job = _add_job(service)
+    service._notify_job(job)
+
+    started = time.monotonic()
+    result = asyncio.run(service.wait_for_update("job", revision=0, timeout=5))
+
+    assert result is job
+    assert time.monotonic() - started < 1
+    assert not service._job_waiters
+
+
+def test_wait_for_update_returns_immediately_for_finished_job(service):
+    """已结束的任务不进入等待"""
+    job = _add_job(service, JobStatus.COMPLETED)
+
+    result = asyncio.run(service.wait_for_update("job", revision=job.revision, timeout=5))
+
+    assert result is job
+    assert not service._job_waiters
+
+
+def test_wait_for_update_times_out_with_same_revision(service):
+    """无变化时等待超时后返回当前状态"""
+    job = _add_job(service)
+
+    result = asyncio.run(service.wait_for_update("job", revision=0, timeout=0.05))
+
+    assert result is job
+    assert result.revision == 0
+
+
+def test_wait_for_update_wakes_on_notify(service):
+    """任务变化时唤醒所有等待者，并移除共享事件"""
+    job = _add_job(service)
+
+    async def scenario():
+        waiters = [
+            asyncio.create_task(service.wait_for_update("job", revision=0, timeout=5))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        assert len(service._job_waiters) == 1
+        service._notify_job(job)
+        return await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+
+    results = asyncio.run(scenario())
+
+    assert [result.revision for result in results] == [1, 1]
+    assert not service._job_waiters
+
+
+def test_wait_for_update_unknown_job_returns_none(service):
+    """任务不存在时返回 None"""
+    assert asyncio.run(service.wait_for_update("missing", revision=0, timeout=5)) is None
+
+
+def test_cleanup_releases_waiters_of_deleted_jobs(service):
+    """清理时唤醒并移除已删除任务的等待者"""
+    async def scenario():
+        waiter = service._job_waiters["gone"] = asyncio.Event()
+        service._cleanup_expired()
+        return waiter
+
+    waiter = asyncio.run(scenario())
+
+    assert waiter.is_set()
+    assert not service._job_waiters
+
+
+def test_generate_images_rejects_when_queue_is_full(service):
+    """运行与排队中的任务数达到上限时拒绝新任务"""
+    service._max_inflight_jobs = 0
+
+    with pytest.raises(ImageQueueFullError):
+        asyncio.run(service.generate_images(prompt="cat"))
+
+    assert not service._jobs
+
+
+def test_expire_stale_job_ignores_time_spent_queued(service, monkeypatch):
+    """排队中的任务不计入处理超时，开始处理后才计时"""
+    monkeypatch.setattr(Config, "PROCESSING_JOB_MAX_SECONDS", 60)
+    job = _add_job(service, JobStatus.PENDING)
+    job.created_at = time.time() - 3600
+
+    service._expire_stale_job(job, time.time())
+    assert job.status == JobStatus.PENDING
+
+    job.status = JobStatus.PROCESSING
+    job.started_at = time.time() - 3600
+    service._expire_stale_job(job, time.time())
+    assert job.status == JobStatus.FAILED
+    assert job.error_message == "任务超时"
+
+
+def test_queued_job_is_skipped_once_no_longer_pending(service):
+    """排队期间已结束的任务拿到并发名额后不再执行"""
+    async def scenario():
+        service._job_semaphore = asyncio.Semaphore(0)
+        job_id = await service.generate_images(prompt="cat")
+        job = service._jobs[job_id]
+        job.status = JobStatus.FAILED
+        job.error_message = "任务超时"
+        revision = job.revision
+
+        service._job_semaphore.release()
+        await service._tasks[job_id]
+        return job, revision
+
+    job, revision = asyncio.run(scenario())
+
+    assert job.status == JobStatus.FAILED
+    assert job.error_message == "任务超时"
+    assert job.started_at == 0
+    assert job.revision == revision
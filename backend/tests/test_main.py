@@ -0,0 +1,41 @@
+"""
+应用生命周期测试
+"""
+
+import asyncio
+import importlib
+
+from fastapi.testclient import TestClient
+
+from app.config import Config, start_log_listener
+from app.main import app
+from app.services import image_service, video_service
+from app.services.history_service import HistoryService
+
+main_module = importlib.import_module("app.main")
+
+
+def test_lifespan_can_run_twice_in_one_process(tmp_path, monkeypatch):
+    """同一进程内再次进入生命周期时日志线程与专用线程池重新可用"""
+    history = HistoryService()
+    history._history_file = tmp_path / "history.jsonl"
+    history._legacy_file = tmp_path / "history.json"
+    monkeypatch.setattr(main_module, "history_service", history)
+
+    try:
+        for _ in range(2):
+            with TestClient(app):
+                assert Config.LOG_LISTENER_RUNNING
+            assert not Config.LOG_LISTENER_RUNNING
+
+        async def run_blocking():
+            return (
+                await image_service._run_blocking(sum, [1, 2]),
+                await video_service._run_blocking(sum, [3, 4]),
+            )
+
+        assert asyncio.run(run_blocking()) == (3, 7)
+    finally:
+        start_log_listener()
+        image_service.close()
+        video_service.close()
@@ -0,0 +1,106 @@
+"""
+API 路由测试 (批量删除历史记录、图像任务排队已满与文件读取)
+"""
+
+import asyncio
+import importlib
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.history_service import HistoryService
+from app.services.image_service import ImageJob, JobStatus
+
+history_router_module = importlib.import_module("app.routers.history")
+image_router_module = importlib.import_module("app.routers.image")
+
+
+@pytest.fixture
+def client():
+    """不触发应用生命周期 (不启动后台清理与预热) 的测试客户端"""
+    return TestClient(app)
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    """将历史记录路由替换为读写临时目录的服务实例"""
+    service = HistoryService()
+    service._history_file = tmp_path / "history.jsonl"
+    service._legacy_file = tmp_path / "history.json"
+    monkeypatch.setattr(history_router_module, "history_service", service)
+    return service
+
+
+def test_batch_delete_ignores_unknown_ids(client, history):
+    """批量删除时不存在的 ID 被忽略，只返回实际删除的数量"""
+    record_id = asyncio.run(history.add_record("image", "a", "a.png"))
+
+    response = client.post(
+        "/api/history/batch-delete", json={"ids": [record_id, "missing", record_id]}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["deleted_count"] == 1
+    _, total = asyncio.run(history.get_history())
+    assert total == 0
+
+
+def test_batch_delete_with_only_unknown_ids(client, history):
+    """全部 ID 都不存在时返回 0"""
+    response = client.post("/api/history/batch-delete", json={"ids": ["missing"]})
+
+    assert response.status_code == 200
+    assert response.json()["deleted_count"] == 0
+
+
+def test_batch_delete_rejects_empty_ids(client, history):
+    """空 ID 列表不通过请求校验"""
+    response = client.post("/api/history/batch-delete", json={"ids": []})
+
+    assert response.status_code == 422
+
+
+def test_generate_image_returns_503_when_queue_is_full(client, monkeypatch):
+    """图像生成任务排队已满时返回 503"""
+    monkeypatch.setattr(image_router_module.image_service, "_max_inflight_jobs", 0)
+
+    response = client.post("/api/image/generate", json={"prompt": "cat"})
+
+    assert response.status_code == 503
+    assert response.json()["detail"]
+
+
+def test_image_status_long_poll_times_out(client, monkeypatch):
+    """长轮询在无变化时等待超时后返回当前版本号"""
+    service = image_router_module.image_service
+    now = time.time()
+    job = ImageJob(job_id="poll", status=JobStatus.PROCESSING, created_at=now, started_at=now)
+    monkeypatch.setitem(service._jobs, "poll", job)
+    monkeypatch.setattr(service, "_job_waiters", {})
+
+    response = client.get("/api/image/status/poll", params={"wait": 0.1, "revision": 0})
+
+    assert response.status_code == 200
+    assert response.json()["revision"] == 0
+    assert response.json()["status"] == "processing"
+
+
+
+def test_get_image_returns_404_when_stat_fails(client, monkeypatch):
+    """stat 因权限等原因失败时同样视为文件不存在"""
+    real_stat = os.stat
+
+    def failing_stat(path, *args, follow_symlinks=True, **kwargs):
+        # 只让路由中的 stat 失败，路径解析里的 lstat 照常执行
+        if follow_symlinks and os.fspath(path).endswith("locked.png"):
+            raise PermissionError(13, "Permission denied", os.fspath(path))
+        return real_stat(path, *args, follow_symlinks=follow_symlinks, **kwargs)
+
+    monkeypatch.setattr(os, "stat", failing_stat)
+
+    response = client.get("/api/image/locked.png")
+
+    assert response.status_code == 404